@@ -0,0 +1,295 @@
+from typing import Any, Dict, List, Optional
+import json
+import os
+import re
+import time
+import tracemalloc
+
+from metrics import percentile, process_rss_mb
+
+FIELDS = ["action", "target", "value", "url", "element_type"]
+
+# Labeled commands covering every action and element_type in the classifier prompt.
+# Only the fields present in a label are scored for that command.
+EVAL_CORPUS = [
+    # navigate
+    {"command": "go to youtube", "expected": {"action": "navigate", "target": "youtube", "url": "https://www.youtube.com", "element_type": None}},
+    {"command": "navigate to example.com", "expected": {"action": "navigate", "url": "https://example.com", "element_type": None}},
+    {"command": "open github", "expected": {"action": "navigate", "target": "github", "url": "https://www.github.com", "element_type": None}},
+    {"command": "visit https://www.wikipedia.org", "expected": {"action": "navigate", "url": "https://www.wikipedia.org", "element_type": None}},
+    # search
+    {"command": "search for cats on youtube", "expected": {"action": "search", "target": "youtube", "value": "cats", "url": "https://www.youtube.com", "element_type": "search_input"}},
+    {"command": "search for python programming", "expected": {"action": "search", "value": "python programming", "element_type": "search_input"}},
+    {"command": "find videos about dogs", "expected": {"action": "search", "value": "dogs", "element_type": "search_input"}},
+    {"command": "look for wireless headphones on amazon", "expected": {"action": "search", "target": "amazon", "value": "wireless headphones", "element_type": "search_input"}},
+    # type
+    {"command": "type your name in the username field", "expected": {"action": "type", "target": "username", "value": "your name", "element_type": "input"}},
+    {"command": "type hello world in the message box", "expected": {"action": "type", "target": "message", "value": "hello world", "element_type": "input"}},
+    {"command": "enter john@example.com in the email field", "expected": {"action": "type", "target": "email", "value": "john@example.com", "element_type": "input"}},
+    # click
+    {"command": "click the sign in button", "expected": {"action": "click", "target": "sign in button", "element_type": "button"}},
+    {"command": "click the submit button", "expected": {"action": "click", "target": "submit button", "element_type": "button"}},
+    {"command": "click on the first video", "expected": {"action": "click", "target": "first video", "element_type": "video"}},
+    {"command": "click the about link", "expected": {"action": "click", "target": "about link", "element_type": "link"}},
+    {"command": "click the contact form", "expected": {"action": "click", "target": "contact form", "element_type": "form"}},
+    {"command": "click the search box", "expected": {"action": "click", "target": "search box", "element_type": "search_input"}},
+    # wait
+    {"command": "wait for 5 seconds", "expected": {"action": "wait", "value": "5", "element_type": None}},
+    {"command": "wait 10 seconds", "expected": {"action": "wait", "value": "10", "element_type": None}},
+    {"command": "pause for 2 seconds", "expected": {"action": "wait", "value": "2", "element_type": None}},
+    # scroll
+    {"command": "scroll down the page", "expected": {"action": "scroll", "target": "page", "value": "down", "element_type": None}},
+    {"command": "scroll up", "expected": {"action": "scroll", "value": "up", "element_type": None}},
+    {"command": "scroll to the bottom", "expected": {"action": "scroll", "value": "bottom", "element_type": None}},
+    {"command": "scroll to the end of the feed", "expected": {"action": "scroll", "value": "end"}},
+    # extract
+    {"command": "extract all article titles", "expected": {"action": "extract", "element_type": None}},
+    {"command": "extract all links", "expected": {"action": "extract", "target": "links", "element_type": "link"}},
+    {"command": "extract the form fields", "expected": {"action": "extract", "element_type": "form"}},
+    {"command": "extract the video titles", "expected": {"action": "extract", "element_type": "video"}},
+    # help / exit
+    {"command": "help", "expected": {"action": "help", "element_type": None}},
+    {"command": "show me the available commands", "expected": {"action": "help", "element_type": None}},
+    {"command": "exit", "expected": {"action": "exit", "element_type": None}},
+    {"command": "quit the browser", "expected": {"action": "exit", "element_type": None}},
+]
+
+
+def normalize(field: str, value: Any) -> Optional[str]:
+    """
+    Normalize a field value so cosmetic differences are not scored as errors
+    """
+    if value is None:
+        return None
+    text = str(value).strip().strip("'\"").lower()
+    if text in ("", "null", "none"):
+        return None
+    if field == "url":
+        text = re.sub(r"^https?://(www\.)?", "", text).rstrip("/")
+    elif field == "value":
+        text = re.sub(r"\s*seconds?$", "", text)
+    return " ".join(text.split())
+
+
+class StubClassifier:
+    """
+    Rule-based stand-in with the CommandClassifier interface, for running
+    the harness without a model
+    """
+
+    def classify_command(self, command: str) -> dict:
+        text = command.lower().strip()
+        result = {"action": None, "target": None, "value": None, "url": None, "element_type": None}
+
+        def site_url(site: str) -> str:
+            if site.startswith(("http://", "https://")):
+                return site
+            return f"https://{site}" if "." in site else f"https://www.{site}.com"
+
+        match = re.match(r"(?:go to|navigate to|open|visit)\s+(\S+)", text)
+        if match:
+            site = match.group(1)
+            result.update(action="navigate", target=site, url=site_url(site))
+            return result
+
+        match = re.match(r"(?:search for|find|look for)\s+(?:videos about\s+)?(.+?)(?:\s+on\s+(\w+))?$", text)
+        if match:
+            result.update(action="search", value=match.group(1), element_type="search_input")
+            if match.group(2):
+                result.update(target=match.group(2), url=site_url(match.group(2)))
+            return result
+
+        match = re.match(r"(?:type|enter)\s+(.+?)\s+in(?:to)?\s+the\s+(\w+)", text)
+        if match:
+            result.update(action="type", value=match.group(1), target=match.group(2), element_type="input")
+            return result
+
+        def element_type_for(target: str) -> Optional[str]:
+            for word, element_type in (("search", "search_input"), ("video", "video"), ("link", "link"),
+                                       ("form", "form"), ("button", "button")):
+                if word in target:
+                    return element_type
+            return None
+
+        match = re.match(r"click\s+(?:on\s+)?(?:the\s+)?(.+)", text)
+        if match:
+            target = match.group(1)
+            result.update(action="click", target=target, element_type=element_type_for(target) or "button")
+            return result
+
+        match = re.match(r"(?:wait|pause)(?:\s+for)?\s*(\d+)?", text)
+        if match:
+            result.update(action="wait", value=match.group(1) or "2")
+            return result
+
+        if text.startswith("scroll"):
+            direction = next((d for d in ("up", "top", "bottom", "end") if d in text), "down")
+            result.update(action="scroll", target="page", value=direction)
+            return result
+
+        match = re.match(r"extract\s+(?:all\s+|the\s+)?(.+)", text)
+        if match:
+            target = match.group(1)
+            result.update(action="extract", target=target, element_type=element_type_for(target))
+            return result
+
+        if text in ("help",) or "commands" in text:
+            result["action"] = "help"
+        elif text in ("exit", "quit") or text.startswith(("exit", "quit")):
+            result["action"] = "exit"
+        return result
+
+
+def evaluate(classifier, corpus: List[Dict] = None, warmup: int = 1,
+             trace_python_memory: bool = False) -> Dict[str, Any]:
+    """
+    Run a classifier over a labeled corpus and report accuracy, parse failures,
+    latency, generated tokens and peak memory. Any object with a
+    classify_command(command) -> dict method can be evaluated.
+
+    RSS is sampled after every command and reported relative to a baseline
+    taken before the run, so memory used while loading the model (which
+    dominates the process-lifetime peak) is not attributed to inference.
+    """
+    corpus = corpus or EVAL_CORPUS
+
+    # Keep one-off costs (lazy init, CUDA kernels) out of the latency numbers
+    for item in corpus[:warmup]:
+        classifier.classify_command(item["command"])
+
+    torch = None
+    try:
+        import torch
+        if torch.cuda.is_available():
+            torch.cuda.reset_peak_memory_stats()
+        else:
+            torch = None
+    except ImportError:
+        pass
+
+    if trace_python_memory:
+        tracemalloc.start()
+
+    pid = os.getpid()
+    rss_baseline = process_rss_mb(pid)
+    rss_peak = rss_baseline
+
+    field_totals = {field: 0 for field in FIELDS}
+    field_correct = {field: 0 for field in FIELDS}
+    latencies = []
+    tokens = []
+    parse_failures = 0
+    exact_matches = 0
+    mismatches = []
+
+    for item in corpus:
+        start = time.perf_counter()
+        try:
+            result = classifier.classify_command(item["command"])
+        except Exception as e:
+            print(f"Error classifying '{item['command']}': {e}")
+            result = None
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        rss = process_rss_mb(pid)
+        if rss is not None and rss_peak is not None:
+            rss_peak = max(rss_peak, rss)
+
+        generated = getattr(classifier, "last_generated_tokens", None)
+        if generated is not None:
+            tokens.append(generated)
+
+        if not isinstance(result, dict) or not result.get("action"):
+            parse_failures += 1
+            result = {}
+
+        wrong = {}
+        for field, expected in item["expected"].items():
+            field_totals[field] += 1
+            actual = result.get(field)
+            if normalize(field, actual) == normalize(field, expected):
+                field_correct[field] += 1
+            else:
+                wrong[field] = {"expected": expected, "actual": actual}
+        if wrong:
+            mismatches.append({"command": item["command"], "fields": wrong})
+        else:
+            exact_matches += 1
+
+    python_peak = None
+    if trace_python_memory:
+        python_peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+
+    count = len(corpus)
+    return {
+        "commands": count,
+        "field_accuracy": {
+            field: round(field_correct[field] / field_totals[field], 3)
+            for field in FIELDS if field_totals[field]
+        },
+        "exact_match_rate": round(exact_matches / count, 3) if count else 0.0,
+        "parse_failure_rate": round(parse_failures / count, 3) if count else 0.0,
+        "latency_p50_ms": round(percentile(latencies, 50), 2),
+        "latency_p95_ms": round(percentile(latencies, 95), 2),
+        "tokens_per_command": round(sum(tokens) / len(tokens), 1) if tokens else None,
+        "rss_baseline_mb": round(rss_baseline, 1) if rss_baseline is not None else None,
+        "peak_rss_mb": round(rss_peak, 1) if rss_peak is not None else None,
+        "rss_growth_mb": round(rss_peak - rss_baseline, 1) if rss_baseline is not None else None,
+        "peak_python_mb": round(python_peak, 1) if python_peak is not None else None,
+        "peak_cuda_mb": round(torch.cuda.max_memory_allocated() / (1024 * 1024), 1) if torch else None,
+        "mismatches": mismatches
+    }
+
+
+def print_report(report: Dict[str, Any], show_mismatches: bool = False) -> None:
+    print(f"\nCommands evaluated: {report['commands']}")
+    print("Field accuracy:")
+    for field, accuracy in report["field_accuracy"].items():
+        print(f"  {field:<13} {accuracy:.1%}")
+    print(f"Exact match rate:   {report['exact_match_rate']:.1%}")
+    print(f"Parse failure rate: {report['parse_failure_rate']:.1%}")
+    print(f"Latency p50/p95:    {report['latency_p50_ms']} / {report['latency_p95_ms']} ms")
+    for key, label in (("tokens_per_command", "Tokens per command"), ("rss_baseline_mb", "RSS baseline (MB)"),
+                       ("peak_rss_mb", "Peak RSS (MB)"), ("rss_growth_mb", "RSS growth during run (MB)"),
+                       ("peak_python_mb", "Peak Python heap (MB)"), ("peak_cuda_mb", "Peak CUDA (MB)")):
+        if report[key] is not None:
+            print(f"{label}: {report[key]}")
+
+    if show_mismatches:
+        for mismatch in report["mismatches"]:
+            print(f"\n  {mismatch['command']}")
+            for field, diff in mismatch["fields"].items():
+                print(f"    {field}: expected {diff['expected']!r}, got {diff['actual']!r}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Evaluate command classifier accuracy and throughput")
+    parser.add_argument("--stub", action="store_true", help="Evaluate the rule-based stub instead of a model")
+    parser.add_argument("--model", default="google/gemma-3-1b-it")
+    parser.add_argument("--device", default="cuda")
+    parser.add_argument("--max-new-tokens", type=int, default=500)
+    parser.add_argument("--corpus", help="JSON file with a list of {command, expected} items")
+    parser.add_argument("--trace-memory", action="store_true", help="Also trace peak Python heap (slower)")
+    parser.add_argument("--mismatches", action="store_true", help="List every mis-classified field")
+    parser.add_argument("--json", action="store_true", help="Print the full report as JSON")
+    args = parser.parse_args()
+
+    if args.stub:
+        classifier = StubClassifier()
+    else:
+        from command_classifier import CommandClassifier
+        classifier = CommandClassifier(args.model, args.device, args.max_new_tokens)
+
+    corpus = None
+    if args.corpus:
+        with open(args.corpus) as f:
+            corpus = json.load(f)
+
+    report = evaluate(classifier, corpus, trace_python_memory=args.trace_memory)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report, args.mismatches)
@@ -0,0 +1,263 @@
+from concurrent.futures import Future
+from collections import Counter
+from typing import Dict, List, Tuple, Union
+import json
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+
+from metrics import LatencyStats
+
+
+class ReusableTCPServer(socketserver.ThreadingTCPServer):
+    # Allow an immediate restart on the same port while old connections sit in TIME_WAIT
+    allow_reuse_address = True
+
+
+def parse_address(address: str) -> Union[str, Tuple[str, int]]:
+    """
+    'unix:/path/to.sock' -> socket path, 'host:port' -> (host, port)
+    """
+    if address.startswith("unix:"):
+        return address[len("unix:"):]
+    host, _, port = address.rpartition(":")
+    return (host or "127.0.0.1", int(port))
+
+
+class ClassifierService:
+    """
+    Serves one loaded classifier to many clients over a local socket.
+    Requests arriving within max_latency_ms of each other are grouped into a
+    single classify_batch call of at most max_batch_size commands.
+
+    Protocol: one JSON object per line, {"op": "classify", "command": ...}
+    or {"op": "stats"}, answered by one JSON line each.
+    """
+
+    def __init__(self, classifier, address: str = "127.0.0.1:8766", max_batch_size: int = 8,
+                 max_latency_ms: float = 10.0, max_queue: int = 256):
+        self.classifier = classifier
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1000
+        self.requests = queue.Queue(maxsize=max_queue)
+
+        self.stats = LatencyStats()
+        self.batch_sizes = Counter()
+        self.max_queue_depth = 0
+        self.running = True
+
+        self.server = self._make_server(parse_address(address))
+        self.batcher = threading.Thread(target=self._run_batches, daemon=True)
+        self.batcher.start()
+
+    def _make_server(self, address):
+        service = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    if not line.strip():
+                        continue
+                    try:
+                        request = json.loads(line)
+                        response = service.handle_request(request)
+                    except Exception as e:
+                        response = {"error": str(e)}
+                    self.wfile.write((json.dumps(response) + "\n").encode("utf-8"))
+                    self.wfile.flush()
+
+        if isinstance(address, str):
+            if os.path.exists(address):
+                os.remove(address)
+            server = socketserver.ThreadingUnixStreamServer(address, Handler)
+        else:
+            server = ReusableTCPServer(address, Handler)
+        server.daemon_threads = True
+        return server
+
+    def handle_request(self, request: Dict) -> Dict:
+        op = request.get("op", "classify")
+        if op == "stats":
+            return self.get_stats()
+        if op != "classify" or not request.get("command"):
+            return {"error": "Expected {'op': 'classify', 'command': ...}"}
+
+        start = time.perf_counter()
+        future = Future()
+        try:
+            self.requests.put_nowait((request["command"], future, start))
+        except queue.Full:
+            return {"error": "Classifier queue is full, retry later"}
+        self.max_queue_depth = max(self.max_queue_depth, self.requests.qsize())
+
+        try:
+            result = future.result()
+        except Exception as e:
+            self.stats.record("request", time.perf_counter() - start, ok=False)
+            return {"error": str(e)}
+        self.stats.record("request", time.perf_counter() - start)
+        return {"result": result}
+
+    def _collect_batch(self) -> List:
+        """
+        Block for the first request, then gather more until the batch is full
+        or max_latency has passed since the first one arrived
+        """
+        batch = [self.requests.get()]
+        deadline = time.perf_counter() + self.max_latency
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run_batches(self):
+        while self.running:
+            batch = self._collect_batch()
+            now = time.perf_counter()
+            for _, _, enqueued in batch:
+                self.stats.record("queue_wait", now - enqueued)
+
+            self.batch_sizes[len(batch)] += 1
+            start = time.perf_counter()
+            try:
+                results = self.classifier.classify_batch([command for command, _, _ in batch])
+                for (_, future, _), result in zip(batch, results):
+                    future.set_result(result)
+                self.stats.record("batch_forward", time.perf_counter() - start)
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                self.stats.record("batch_forward", time.perf_counter() - start, ok=False)
+
+    def get_stats(self) -> Dict:
+        return {
+            "queue_depth": self.requests.qsize(),
+            "max_queue_depth": self.max_queue_depth,
+            "batches": sum(self.batch_sizes.values()),
+            "batch_sizes": {str(size): count for size, count in sorted(self.batch_sizes.items())},
+            "latency": self.stats.snapshot()
+        }
+
+    def serve_forever(self):
+        print(f"Classifier service listening on {self.server.server_address}")
+        try:
+            self.server.serve_forever()
+        finally:
+            self.running = False
+            self.server.server_close()
+
+
+class RemoteClassifier:
+    """
+    Drop-in replacement for CommandClassifier that talks to a ClassifierService.
+    Each thread keeps its own connection so concurrent callers can share a batch.
+    """
+
+    # Safe to call from several threads at once, so no external lock is needed
+    thread_safe = True
+
+    def __init__(self, address: str = "127.0.0.1:8766", timeout: float = 120.0):
+        self.address = parse_address(address)
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def _connect(self):
+        if isinstance(self.address, str):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.address)
+        self.local.sock = sock
+        self.local.reader = sock.makefile("rb")
+
+    def _request(self, payload: Dict) -> Dict:
+        # Retry once on a fresh connection when a kept-alive connection turns out to be
+        # dead (the service was restarted). Timeouts are not retried: the service may
+        # still be working on the request and a resend would only add to its queue.
+        for attempt in range(2):
+            reused = getattr(self.local, "sock", None) is not None
+            try:
+                if not reused:
+                    self._connect()
+                self.local.sock.sendall((json.dumps(payload) + "\n").encode("utf-8"))
+            except (ConnectionRefusedError, BrokenPipeError, ConnectionResetError):
+                self.close()
+                if attempt:
+                    raise
+                continue
+
+            try:
+                line = self.local.reader.readline()
+            except OSError:
+                self.close()
+                raise
+            if not line:
+                self.close()
+                # An idle connection closed by a restarted service, the request never ran
+                if reused and not attempt:
+                    continue
+                raise ConnectionError("Classifier service closed the connection")
+            return json.loads(line)
+
+    def classify_command(self, command: str) -> dict:
+        try:
+            response = self._request({"op": "classify", "command": command})
+            if "error" in response:
+                raise RuntimeError(response["error"])
+            return response["result"]
+        except Exception as e:
+            print(f"Error classifying command: {e}")
+            return {
+                "action": None,
+                "target": None,
+                "value": None,
+                "url": None,
+                "element_type": None
+            }
+
+    def stats(self) -> Dict:
+        return self._request({"op": "stats"})
+
+    def close(self):
+        sock = getattr(self.local, "sock", None)
+        if sock is not None:
+            try:
+                self.local.reader.close()
+                sock.close()
+            except OSError:
+                pass
+        self.local.sock = None
+
+
+if __name__ == "__main__":
+    import argparse
+    from command_classifier import CommandClassifier
+
+    parser = argparse.ArgumentParser(description="Serve one classifier to all browser workers")
+    parser.add_argument("--address", default="127.0.0.1:8766", help="host:port or unix:/path/to.sock")
+    parser.add_argument("--max-batch-size", type=int, default=8)
+    parser.add_argument("--max-latency-ms", type=float, default=10.0)
+    parser.add_argument("--model", default="google/gemma-3-1b-it")
+    parser.add_argument("--device", default="cuda")
+    parser.add_argument("--max-new-tokens", type=int, default=500)
+    args = parser.parse_args()
+
+    service = ClassifierService(
+        CommandClassifier(args.model, args.device, args.max_new_tokens),
+        address=args.address,
+        max_batch_size=args.max_batch_size,
+        max_latency_ms=args.max_latency_ms
+    )
+    try:
+        service.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down...")
@@ -2,16 +2,25 @@ from transformers import AutoModelForCausalLM, AutoTokenizer, pipeline
 import torch
 import json
 import re
-from typing import Dict, Tuple
+from typing import Dict, List, Tuple
 
 class CommandClassifier:
-    def __init__(self):
+    def __init__(self, model_name: str = "google/gemma-3-1b-it", device: str = "cuda", max_new_tokens: int = 500):
         # Initialize the model and tokenizer
-        print("Loading Gemma-1b-it model...")
-        self.pipe = pipeline("text-generation", model="google/gemma-3-1b-it", device="cuda", torch_dtype=torch.bfloat16)
+        print(f"Loading {model_name} model...")
+        self.pipe = pipeline("text-generation", model=model_name, device=device, torch_dtype=torch.bfloat16)
+        self.max_new_tokens = max_new_tokens
+
+        # Batched generation on a decoder-only model needs left padding
+        self.pipe.tokenizer.padding_side = "left"
+        if self.pipe.tokenizer.pad_token is None:
+            self.pipe.tokenizer.pad_token = self.pipe.tokenizer.eos_token
         
         # Initialize context
         self.current_url = None
+
+        # Number of tokens generated for the most recent command
+        self.last_generated_tokens = 0
         
         # Define the classification prompt template
         self.prompt_template = """
@@ -109,6 +118,15 @@ Examples:
     url: null,
     element_type: video
 }
+
+8. For "scroll to the end of the feed", return:
+{
+    action: scroll,
+    target: feed,
+    value: end,
+    url: null,
+    element_type: link
+}
 """
     
     def parse_list_to_dict(self, response_list: list) -> dict:
@@ -169,7 +187,7 @@ Examples:
                 # Special handling for scroll action
                 if result["action"] == "scroll":
                     result["target"] = "page"
-                    result["value"] = "down"
+                    result["value"] = result["value"] or "down"
                 
                 # Use current URL for search if not specified
                 if result["action"] == "search" and not result["url"] and self.current_url:
@@ -218,25 +236,30 @@ Examples:
             
         return True, ""
 
+    def _build_conversation(self, command: str) -> List[Dict]:
+        """
+        Chat messages for classifying a single command
+        """
+        return [
+            {
+                "role": "system",
+                "content": [{"type": "text", "text": self.prompt_template},]
+            },
+            {
+                "role": "user",
+                "content": [{"type": "text", "text": command},]
+            },
+        ]
+
     def classify_command(self, command: str) -> dict:
         """
         Classify a natural language command using Gemma-1b-it
         """
+        self.last_generated_tokens = 0
         try:
             # Prepare the prompt
-            messages = [
-                [
-                    {
-                        "role": "system",
-                        "content": [{"type": "text", "text": self.prompt_template},]
-                    },
-                    {
-                        "role": "user",
-                        "content": [{"type": "text", "text": command},]
-                    },
-                ],
-            ]
-            output = self.pipe(messages, max_new_tokens=500)
+            messages = [self._build_conversation(command)]
+            output = self.pipe(messages, max_new_tokens=self.max_new_tokens)
             response = []
 
             # Loop through the outer list and then the 'generated_text' list
@@ -245,6 +268,10 @@ Examples:
                     for entry in item['generated_text']:
                         if entry['role'] == 'assistant':
                             response.append(entry['content'])
+
+            self.last_generated_tokens = sum(
+                len(self.pipe.tokenizer(text, add_special_tokens=False)["input_ids"]) for text in response
+            )
             
             print(response)
             # Parse the response list into a dictionary
@@ -261,6 +288,46 @@ Examples:
                 "element_type": None
             }
 
+    def classify_batch(self, commands: List[str]) -> List[dict]:
+        """
+        Classify several commands with a single batched forward pass
+        """
+        self.last_generated_tokens = 0
+        try:
+            output = self.pipe(
+                [self._build_conversation(command) for command in commands],
+                max_new_tokens=self.max_new_tokens,
+                batch_size=len(commands)
+            )
+
+            # One outer item per command, in input order
+            results = []
+            for outer_item in output:
+                response = [
+                    entry['content']
+                    for item in outer_item
+                    for entry in item['generated_text']
+                    if entry['role'] == 'assistant'
+                ]
+                self.last_generated_tokens += sum(
+                    len(self.pipe.tokenizer(text, add_special_tokens=False)["input_ids"]) for text in response
+                )
+                results.append(self.parse_list_to_dict(response))
+            return results
+
+        except Exception as e:
+            print(f"Error classifying batch: {e}")
+            return [
+                {
+                    "action": None,
+                    "target": None,
+                    "value": None,
+                    "url": None,
+                    "element_type": None
+                }
+                for _ in commands
+            ]
+
 # Test the command classifier
 if __name__ == "__main__":
     classifier = CommandClassifier()
@@ -0,0 +1,70 @@
+from typing import Dict, List, Optional, Tuple
+import gzip
+import hashlib
+import json
+import os
+import time
+
+
+class SnapshotStore:
+    """
+    Stores gzip-compressed snapshots of rendered pages, one file per URL
+    holding the latest capture, so they can be re-extracted without a browser
+    """
+
+    def __init__(self, snapshot_dir: str, compresslevel: int = 6):
+        self.snapshot_dir = snapshot_dir
+        self.compresslevel = compresslevel
+
+        # url -> DOM version of the last capture, to skip unchanged pages
+        self.versions: Dict[str, Tuple] = {}
+
+        os.makedirs(snapshot_dir, exist_ok=True)
+
+    def path_for(self, url: str) -> str:
+        return os.path.join(self.snapshot_dir, hashlib.sha1(url.encode("utf-8")).hexdigest() + ".json.gz")
+
+    def capture(self, page, version: Optional[Tuple] = None) -> Optional[str]:
+        """
+        Snapshot the page's rendered DOM unless it is unchanged since the last capture.
+        Returns the snapshot path, or None when nothing was written.
+        """
+        url = page.url
+        if not url.startswith(("http://", "https://", "file://")):
+            return None
+        if version is not None and self.versions.get(url) == version:
+            return None
+
+        try:
+            path = self.save(url, page.content())
+        except Exception as e:
+            print(f"Error capturing snapshot: {e}")
+            return None
+        self.versions[url] = version
+        return path
+
+    def save(self, url: str, html: str) -> str:
+        path = self.path_for(url)
+        record = {"url": url, "captured_at": time.time(), "html": html}
+        with gzip.open(path + ".tmp", "wt", encoding="utf-8", compresslevel=self.compresslevel) as f:
+            json.dump(record, f)
+        os.replace(path + ".tmp", path)
+        return path
+
+    def paths(self) -> List[str]:
+        """
+        List every stored snapshot file
+        """
+        return sorted(
+            os.path.join(self.snapshot_dir, name)
+            for name in os.listdir(self.snapshot_dir)
+            if name.endswith(".json.gz")
+        )
+
+
+def load_snapshot(path: str) -> Dict:
+    """
+    Read a snapshot file into a dict with url, captured_at and html
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return json.load(f)
@@ -1,56 +1,46 @@
 from playwright.sync_api import Page
 from typing import Dict, List, Optional, Any
 import json
+from extraction_cache import ExtractionCache, get_dom_version
+from dom_snapshot import SnapshotStore
+from records import to_records
+from extraction_patterns import EXTRACTION_PATTERNS, resolve_category
 
 class ExtractAPI:
-    def __init__(self, page: Page):
+    def __init__(self, page: Page, cache: Optional[ExtractionCache] = None,
+                 snapshot_store: Optional[SnapshotStore] = None):
         self.page = page
+        self.cache = cache
+        self.snapshot_store = snapshot_store
         
-        # Define common data extraction patterns
-        self.extraction_patterns = {
-            "text": {
-                "selectors": [
-                    "p", "h1", "h2", "h3", "h4", "h5", "h6",
-                    "span", "div", "article", "section"
-                ],
-                "attributes": ["textContent", "innerText"]
-            },
-            "links": {
-                "selectors": ["a"],
-                "attributes": ["href", "textContent"]
-            },
-            "images": {
-                "selectors": ["img"],
-                "attributes": ["src", "alt"]
-            },
-            "tables": {
-                "selectors": ["table"],
-                "attributes": ["innerHTML"]
-            },
-            "forms": {
-                "selectors": ["form"],
-                "attributes": ["action", "method"]
-            }
-        }
+        self.extraction_patterns = EXTRACTION_PATTERNS
 
-    def extract_data(self, command: str) -> Dict[str, Any]:
+    def extract_data(self, command: str, compact: bool = False) -> Dict[str, Any]:
         """
-        Extract structured data from the current page based on the command
+        Extract structured data from the current page based on the command.
+        With compact set, items are returned as typed records (see records.to_plain).
         """
         try:
             # Parse the extraction command
-            if "text" in command.lower():
-                return self._extract_text()
-            elif "links" in command.lower():
-                return self._extract_links()
-            elif "images" in command.lower():
-                return self._extract_images()
-            elif "table" in command.lower():
-                return self._extract_tables()
-            elif "form" in command.lower():
-                return self._extract_forms()
-            else:
+            category = resolve_category(command)
+            if not category:
                 return {"error": "Unsupported extraction command"}
+            extractor = getattr(self, f"_extract_{category}")
+
+            if self.snapshot_store:
+                self.snapshot_store.capture(self.page, get_dom_version(self.page))
+
+            if not self.cache:
+                result = extractor()
+            else:
+                # Reuse the previous result while the DOM is unchanged
+                cache_key = self.cache.make_key(self.page, "category", category)
+                result = self.cache.get(cache_key)
+                if result is None:
+                    result = extractor()
+                    result = self.cache.put(cache_key, result)
+
+            return to_records(result) if compact else result
                 
         except Exception as e:
             return {"error": f"Extraction failed: {str(e)}"}
@@ -0,0 +1,178 @@
+from playwright.sync_api import Page
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+# Installs a per-document mutation counter. The epoch (performance.timeOrigin)
+# changes on every navigation or reload, so (epoch, version) identifies one DOM state.
+DOM_VERSION_SCRIPT = """
+(() => {
+    if (window.__domVersion) return;
+    const options = { childList: true, subtree: true, attributes: true, characterData: true };
+    const state = { epoch: String(performance.timeOrigin), version: 0, observer: null };
+
+    // Mutations inside shadow roots are invisible to an observer on document,
+    // so every shadow root gets observed as well
+    const observed = new WeakSet();
+    const observeShadowRoots = (root) => {
+        if (root.shadowRoot && !observed.has(root.shadowRoot)) {
+            observed.add(root.shadowRoot);
+            state.observer.observe(root.shadowRoot, options);
+        }
+        if (!root.querySelectorAll) return;
+        for (const element of root.querySelectorAll('*')) {
+            if (element.shadowRoot) observeShadowRoots(element);
+        }
+    };
+
+    state.observer = new MutationObserver((records) => {
+        state.version++;
+        // Declarative shadow roots arrive with parsed nodes rather than via attachShadow
+        for (const record of records) {
+            for (const node of record.addedNodes) {
+                if (node.nodeType === 1) observeShadowRoots(node);
+            }
+        }
+    });
+    state.observer.observe(document, options);
+
+    const attachShadow = Element.prototype.attachShadow;
+    Element.prototype.attachShadow = function (init) {
+        const shadowRoot = attachShadow.call(this, init);
+        observed.add(shadowRoot);
+        state.observer.observe(shadowRoot, options);
+        state.version++;
+        return shadowRoot;
+    };
+
+    // Installed after load (outside an init script): pick up existing shadow roots
+    observeShadowRoots(document);
+    window.__domVersion = state;
+})();
+"""
+
+# Mutation callbacks are delivered asynchronously, so flush pending records
+# before reading the counter to avoid serving a result for a stale version.
+READ_DOM_VERSION_SCRIPT = """
+() => {
+    const state = window.__domVersion;
+    if (!state) return null;
+    if (state.observer.takeRecords().length) state.version++;
+    return [state.epoch, state.version];
+}
+"""
+
+
+class FrozenList(list):
+    """
+    Read-only list for cached results shared between callers.
+    Copying or pickling yields a plain, mutable list.
+    """
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Cached extraction results are read-only, copy them before modifying")
+
+    append = extend = insert = remove = pop = clear = sort = reverse = _readonly
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _readonly
+
+    def __reduce__(self):
+        return (list, (list(self),))
+
+
+class FrozenDict(dict):
+    """
+    Read-only dict for cached results shared between callers.
+    Copying or pickling yields a plain, mutable dict.
+    """
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Cached extraction results are read-only, copy them before modifying")
+
+    update = setdefault = pop = popitem = clear = _readonly
+    __setitem__ = __delitem__ = __ior__ = _readonly
+
+    def __reduce__(self):
+        return (dict, (dict(self),))
+
+
+def freeze(value: Any) -> Any:
+    """
+    Recursively convert lists and dicts into their read-only counterparts
+    """
+    if isinstance(value, list):
+        return FrozenList(freeze(item) for item in value)
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    return value
+
+
+def get_dom_version(page: Page) -> Optional[Tuple[str, int]]:
+    """
+    Return the (epoch, version) of the page's current DOM, installing the
+    counter on first use. Returns None when the version is not yet known.
+    """
+    try:
+        version = page.evaluate(READ_DOM_VERSION_SCRIPT)
+        if version is None:
+            page.evaluate(DOM_VERSION_SCRIPT)
+            return None
+        return tuple(version)
+    except Exception:
+        # The page is mid-navigation, treat as unknown
+        return None
+
+
+class ExtractionCache:
+    """
+    LRU cache of extraction results keyed on the page URL and DOM version.
+    Results are frozen once when stored and then handed out without copying,
+    so a hit costs a dictionary lookup regardless of the result size.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def make_key(self, page: Page, *query: Hashable) -> Optional[Tuple]:
+        """
+        Build a cache key for a query on the page, or None if the page cannot be versioned
+        """
+        version = get_dom_version(page)
+        if version is None:
+            return None
+        return (page.url, version) + tuple(query)
+
+    def get(self, key: Optional[Tuple]) -> Optional[Any]:
+        if key is None or key not in self.entries:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    def put(self, key: Optional[Tuple], value: Any) -> Any:
+        """
+        Store a result and return its frozen form, which callers should use from then on
+        """
+        value = freeze(value)
+        if key is None:
+            return value
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return hit/miss counters and the number of cached results
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self.entries)
+        }
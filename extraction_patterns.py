@@ -0,0 +1,45 @@
+from typing import Optional
+
+# Common data extraction patterns
+EXTRACTION_PATTERNS = {
+    "text": {
+        "selectors": [
+            "p", "h1", "h2", "h3", "h4", "h5", "h6",
+            "span", "div", "article", "section"
+        ],
+        "attributes": ["textContent", "innerText"]
+    },
+    "links": {
+        "selectors": ["a"],
+        "attributes": ["href", "textContent"]
+    },
+    "images": {
+        "selectors": ["img"],
+        "attributes": ["src", "alt"]
+    },
+    "tables": {
+        "selectors": ["table"],
+        "attributes": ["innerHTML"]
+    },
+    "forms": {
+        "selectors": ["form"],
+        "attributes": ["action", "method"]
+    }
+}
+
+def resolve_category(command: str) -> Optional[str]:
+    """
+    Map an extraction command to one of the EXTRACTION_PATTERNS categories
+    """
+    command = command.lower()
+    if "text" in command:
+        return "text"
+    elif "links" in command:
+        return "links"
+    elif "images" in command:
+        return "images"
+    elif "table" in command:
+        return "tables"
+    elif "form" in command:
+        return "forms"
+    return None
@@ -1,19 +1,118 @@
-from typing import Dict, List, Tuple, Optional
-from playwright.sync_api import sync_playwright, Page
+from typing import Dict, List, Tuple, Optional, Union
+from playwright.sync_api import sync_playwright, Page, TimeoutError as PlaywrightTimeoutError
 import time
 import json
 from command_classifier import CommandClassifier
+from nav_cache import NavigationCache
+from extraction_cache import ExtractionCache, DOM_VERSION_SCRIPT, get_dom_version
+from memory_monitor import MemoryMonitor
+from dom_snapshot import SnapshotStore
+from records import ElementTable
+from selector_timing import SelectorTiming
 
 class InteractAPI:
-    def __init__(self):
+    def __init__(self, cache_dir: Optional[str] = None, cache_mode: str = "replay",
+                 classifier: Optional[CommandClassifier] = None, headless: bool = False,
+                 memory_watermark_mb: Optional[float] = None, memory_log: Optional[str] = "memory_log.jsonl",
+                 snapshot_dir: Optional[str] = None):
         # Initialize Playwright
         self.playwright = sync_playwright().start()
-        self.browser = self.playwright.chromium.launch(headless=False)
-        self.context = self.browser.new_context()
+        self.browser = self.playwright.chromium.launch(headless=headless)
+
+        # Optional record/replay cache for repeat visits
+        self.nav_cache = NavigationCache(cache_dir, mode=cache_mode) if cache_dir else None
+
+        # Per-origin selector timeouts and time lost on misses for the last command
+        self.selector_timing = SelectorTiming()
+        self.last_wait_report = {"misses": 0, "wasted_ms": 0.0}
+
+        # Extraction results are reused until the page's DOM actually changes
+        self.extraction_cache = ExtractionCache()
+
+        # Optional compressed DOM snapshots for browser-free re-extraction
+        self.snapshot_store = SnapshotStore(snapshot_dir) if snapshot_dir else None
+
+        # Optional memory watermark that triggers a transparent context recycle
+        self.memory_monitor = MemoryMonitor(memory_watermark_mb, log_file=memory_log) if memory_watermark_mb else None
+
+        self.context = self._new_context()
         self.page = self.context.new_page()
         
-        # Initialize command classifier
-        self.classifier = CommandClassifier()
+        # Initialize command classifier, or reuse one that is already loaded
+        self.classifier = classifier if classifier is not None else CommandClassifier()
+
+    def _new_context(self, storage_state: Optional[Dict] = None):
+        """
+        Create a browser context with the configured request routing
+        """
+        if self.nav_cache:
+            # Service workers would bypass request routing
+            context = self.browser.new_context(service_workers="block", storage_state=storage_state)
+            self.nav_cache.attach(context)
+        else:
+            context = self.browser.new_context(storage_state=storage_state)
+        context.add_init_script(DOM_VERSION_SCRIPT)
+        return context
+
+    def recycle_context(self) -> None:
+        """
+        Replace the browser context with a fresh one, carrying over cookies,
+        localStorage and the current URL. sessionStorage is not preserved.
+        """
+        url = self.page.url
+        state = self.context.storage_state()
+
+        self.context.close()
+        self.extraction_cache.clear()
+        self.context = self._new_context(storage_state=state)
+        self.page = self.context.new_page()
+
+        if url.startswith(('http://', 'https://')):
+            self.page.goto(url)
+
+    def snapshot_page(self, page: Optional[Page] = None) -> Optional[str]:
+        """
+        Store a compressed snapshot of the rendered DOM if snapshots are enabled
+        and the page changed since its last capture
+        """
+        if not self.snapshot_store:
+            return None
+        page = page or self.page
+        return self.snapshot_store.capture(page, get_dom_version(page))
+
+    def check_memory(self) -> None:
+        """
+        Sample memory if an interval has passed and recycle the context above the watermark
+        """
+        if not self.memory_monitor or not self.memory_monitor.due():
+            return
+
+        sample = self.memory_monitor.sample(self.browser, self.page)
+        if not self.memory_monitor.should_recycle(sample):
+            return
+
+        print(f"Memory above {self.memory_monitor.watermark_mb} MB, recycling browser context...")
+        start = time.time()
+        try:
+            self.recycle_context()
+        except Exception as e:
+            print(f"Error recycling context: {e}")
+            return
+
+        after = self.memory_monitor.sample(self.browser, self.page)
+        self.memory_monitor.record_recycle(after)
+        if self.memory_monitor.over_watermark(after):
+            print("Memory is still above the watermark after recycling, waiting for further growth")
+        self.memory_monitor.log({
+            "event": "recycle",
+            "timestamp": time.time(),
+            "url": self.page.url,
+            "duration_s": round(time.time() - start, 2),
+            "rss_before_mb": sample["rss_mb"],
+            "rss_after_mb": after["rss_mb"],
+            "js_heap_before_mb": sample["js_heap_used_mb"],
+            "js_heap_after_mb": after["js_heap_used_mb"]
+        })
 
     def parse_command(self, command: str) -> Dict:
         """
@@ -21,19 +120,47 @@ class InteractAPI:
         """
         return self.classifier.classify_command(command)
 
-    def extract_page_content(self, selector: str, limit: int = 3) -> List[Dict]:
+    def extract_page_content(self, selector: str, limit: int = 3, page: Optional[Page] = None,
+                             compact: bool = False) -> Union[List[Dict], ElementTable]:
         """
-        Extract information from any webpage using a CSS selector
+        Extract information from any webpage using a CSS selector.
+        Uses the current page unless another tab is given. With compact set,
+        returns an ElementTable instead of a list of dicts (see to_dicts()).
         """
+        page = page or self.page
         try:
+            cache_key = self.extraction_cache.make_key(page, "content", selector, limit, compact)
+            cached = self.extraction_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
             # Wait for elements to load
-            self.page.wait_for_selector(selector, timeout=5000)
+            if not self._wait_visible(page.locator(f"{selector} >> visible=true").first, page):
+                raise PlaywrightTimeoutError(f"No element matching {selector} became visible")
             
             # Extract content using JavaScript
-            content = self.page.evaluate("""
-                (selector, limit) => {
+            content = page.evaluate("""
+                ([selector, limit, compact]) => {
                     const items = [];
                     const elements = document.querySelectorAll(selector);
+                    if (compact) {
+                        // Send each attribute name once and refer to it by index
+                        const names = [];
+                        const index = new Map();
+                        for (let i = 0; i < Math.min(elements.length, limit); i++) {
+                            const element = elements[i];
+                            const pairs = [];
+                            for (const attr of element.attributes) {
+                                if (!index.has(attr.name)) {
+                                    index.set(attr.name, names.length);
+                                    names.push(attr.name);
+                                }
+                                pairs.push(index.get(attr.name), attr.value);
+                            }
+                            items.push([element.textContent.trim(), element.href || null, pairs]);
+                        }
+                        return {names: names, rows: items};
+                    }
                     for (let i = 0; i < Math.min(elements.length, limit); i++) {
                         const element = elements[i];
                         items.push({
@@ -46,14 +173,228 @@ class InteractAPI:
                     }
                     return items;
                 }
-            """, selector, limit)
+            """, [selector, limit, compact])
+
+            if compact:
+                table = ElementTable()
+                table.extend_columnar(content["names"], content["rows"])
+                content = table
             
-            return content
+            return self.extraction_cache.put(cache_key, content)
             
         except Exception as e:
             print(f"Error extracting content: {str(e)}")
+            return ElementTable() if compact else []
+
+    def harvest_scroll(self, selector: str, max_items: int = 200, time_budget: float = 30.0,
+                       idle_timeout: float = 2.0, max_idle_rounds: int = 2, reset: bool = False) -> List[Dict]:
+        """
+        Scroll an infinite feed until it is exhausted and return only newly appeared items.
+        Items already returned by an earlier call on the same page are skipped unless reset is set.
+        """
+        harvested = []
+        deadline = time.time() + time_budget
+        idle_rounds = 0
+
+        try:
+            while len(harvested) < max_items and time.time() < deadline:
+                # Serialize only elements that have not been seen before
+                batch = self.page.evaluate("""
+                    ({selector, maxNew, seenCap, reset}) => {
+                        let state = window.__harvestState;
+                        if (!state || reset || state.selector !== selector) {
+                            state = window.__harvestState = {
+                                selector,
+                                seen: new Set(),          // content keys, survives node recycling
+                                processed: new WeakSet(), // nodes already handled
+                                pending: new WeakSet()    // nodes still waiting for content
+                            };
+                        }
+                        const items = [];
+                        const elements = document.querySelectorAll(selector);
+                        for (const element of elements) {
+                            if (items.length >= maxNew) break;
+                            if (state.processed.has(element)) continue;
+
+                            const text = element.textContent.trim();
+                            const href = element.href || null;
+                            if (!text && !href) {
+                                state.pending.add(element);
+                                continue;
+                            }
+                            state.processed.add(element);
+
+                            const key = (href || '') + '\u0000' + text;
+                            if (state.seen.has(key)) continue;
+                            state.seen.add(key);
+                            if (state.seen.size > seenCap) {
+                                state.seen.delete(state.seen.values().next().value);
+                            }
+
+                            items.push({
+                                text: text,
+                                href: href,
+                                attributes: Object.fromEntries(
+                                    Array.from(element.attributes).map(attr => [attr.name, attr.value])
+                                )
+                            });
+                        }
+
+                        // Scroll only as far as the content that has loaded so far
+                        const last = elements[elements.length - 1];
+                        if (last) {
+                            last.scrollIntoView({block: 'end'});
+                        } else {
+                            window.scrollTo(0, document.scrollingElement.scrollHeight);
+                        }
+                        return items;
+                    }
+                """, {"selector": selector, "maxNew": max_items - len(harvested), "seenCap": 10000, "reset": reset})
+                reset = False
+                harvested.extend(batch)
+
+                if len(harvested) >= max_items:
+                    break
+
+                # Wait until an unprocessed element shows up, or give up after the idle timeout
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                try:
+                    self.page.wait_for_function("""
+                        (selector) => {
+                            const state = window.__harvestState;
+                            if (!state) return true;
+                            for (const element of document.querySelectorAll(selector)) {
+                                if (!state.processed.has(element) && !state.pending.has(element)) return true;
+                            }
+                            return false;
+                        }
+                    """, arg=selector, polling=100, timeout=min(idle_timeout, remaining) * 1000)
+                    idle_rounds = 0
+                except PlaywrightTimeoutError:
+                    idle_rounds += 1
+                    if idle_rounds >= max_idle_rounds:
+                        break
+
+        except Exception as e:
+            print(f"Error harvesting content: {str(e)}")
+
+        return harvested
+
+    def fan_out(self, element_type: str = 'link', text: str = None, max_targets: int = 20,
+                concurrency: int = 5, extract_selector: str = 'h1', extract_limit: int = 3,
+                timeout: float = 30.0) -> List[Dict]:
+        """
+        Open every matching link target in parallel tabs and run an extraction on each.
+        Tabs are processed as they finish loading; results are merged in the order
+        the links appear on the current page. Each tab gets timeout seconds from
+        when it opens; failed or timed-out navigations get an 'error' entry.
+        """
+        if concurrency < 1:
+            raise ValueError(f"concurrency must be at least 1, got {concurrency}")
+
+        selector = self.find_best_selector(element_type, text)
+        if not selector:
             return []
 
+        # Read hrefs through the locator since candidate selectors use Playwright-only
+        # syntax (:has-text) that document.querySelectorAll rejects. Over-fetch since
+        # several matches can share a target or carry no href.
+        hrefs = self.page.locator(selector).evaluate_all("""
+            (elements, limit) => elements.slice(0, limit).map(el => {
+                const link = el.closest('a[href]') || el.querySelector('a[href]');
+                return link ? link.href : null;
+            })
+        """, max_targets * 3)
+        urls = []
+        for href in hrefs:
+            if href and href.startswith(('http://', 'https://')) and href not in urls:
+                urls.append(href)
+            if len(urls) >= max_targets:
+                break
+
+        results = [None] * len(urls)
+        in_flight = []
+        next_index = 0
+
+        def open_tab(index: int) -> None:
+            page = self.context.new_page()
+            tab = {'index': index, 'page': page, 'loaded': False, 'status': None, 'error': None,
+                   'deadline': time.time() + timeout}
+
+            def on_response(response):
+                if response.request.is_navigation_request() and response.frame == page.main_frame:
+                    tab['status'] = response.status
+
+            def on_request_failed(request):
+                if request.is_navigation_request() and request.frame == page.main_frame:
+                    tab['error'] = request.failure or 'Navigation failed'
+
+            def on_loaded(page):
+                if page.url != 'about:blank':
+                    tab['loaded'] = True
+
+            page.on('response', on_response)
+            page.on('requestfailed', on_request_failed)
+            page.on('domcontentloaded', on_loaded)
+            try:
+                # Assigning location returns immediately, unlike goto(), so all tabs load concurrently
+                page.evaluate("url => { window.location.href = url; }", urls[index])
+            except Exception:
+                # The navigation can tear down the evaluating context before it returns
+                pass
+            in_flight.append(tab)
+
+        def finish_tab(tab: Dict) -> None:
+            page = tab['page']
+            url = urls[tab['index']]
+            try:
+                if tab['error']:
+                    raise RuntimeError(tab['error'])
+                if tab['status'] is not None and tab['status'] >= 400:
+                    raise RuntimeError(f"HTTP {tab['status']}")
+                results[tab['index']] = {
+                    'url': url,
+                    'final_url': page.url,
+                    'status': tab['status'],
+                    'title': page.title(),
+                    'content': self.extract_page_content(extract_selector, extract_limit, page=page)
+                }
+                self.snapshot_page(page)
+            except Exception as e:
+                results[tab['index']] = {'url': url, 'error': str(e)}
+            finally:
+                page.close()
+
+        try:
+            while in_flight or next_index < len(urls):
+                # Keep the window full
+                while next_index < len(urls) and len(in_flight) < concurrency:
+                    open_tab(next_index)
+                    next_index += 1
+
+                done = [tab for tab in in_flight if tab['loaded'] or tab['error']]
+                if not done:
+                    now = time.time()
+                    done = [tab for tab in in_flight if now >= tab['deadline']]
+                    for tab in done:
+                        tab['error'] = f"Timed out after {timeout}s"
+                if not done:
+                    # Event handlers only run while Playwright is dispatching, so wait on a tab
+                    in_flight[0]['page'].wait_for_timeout(50)
+                    continue
+
+                for tab in done:
+                    in_flight.remove(tab)
+                    finish_tab(tab)
+
+        finally:
+            for tab in in_flight:
+                tab['page'].close()
+
+        return results
+
     def analyze_page_structure(self) -> Dict[str, List[str]]:
         """
         Analyze the current page structure using JavaScript
@@ -131,83 +472,118 @@ class InteractAPI:
             print(f"Error analyzing page structure: {e}")
             return {}
 
-    def find_best_selector(self, element_type: str, text: str = None) -> Optional[str]:
+    def _candidate_selectors(self, element_type: str, text: str = None) -> List[str]:
         """
-        Find the best selector for a given element type and optional text
+        Candidate selectors for an element type, most specific first
         """
-        try:
-            if text:
-                # Try to find element by text content first
-                text_selectors = {
-                    'search_input': [
-                        "input[placeholder*='search' i]",
-                        "input[name*='search' i]",
-                        "input[type='search']"
-                    ],
-                    'button': [
-                        f"button:has-text('{text}')",
-                        f"[role='button']:has-text('{text}')"
-                    ],
-                    'link': [
-                        f"a:has-text('{text}')",
-                        f"[role='link']:has-text('{text}')"
-                    ],
-                    'product': [
-                        f"[data-testid*='product']:has-text('{text}')",
-                        f".product:has-text('{text}')"
-                    ]
-                }
-                
-                for selector in text_selectors.get(element_type, []):
-                    try:
-                        element = self.page.locator(selector).first
-                        if element and element.is_visible():
-                            return selector
-                    except:
-                        continue
-
-            # Website-specific selectors for search
-            if element_type == 'search_input':
-                current_url = self.page.url.lower()
-                if 'youtube.com' in current_url:
-                    return "input[name='search_query']"
-                elif 'amazon' in current_url:
-                    return "#twotabsearchtextbox"
-                elif 'google.com' in current_url:
-                    return "input[name='q']"
-                elif 'github.com' in current_url:
-                    return "input[name='q']"
-
-            # Generic selectors
-            generic_selectors = {
+        candidates = []
+        if text:
+            # Try to find element by text content first
+            text_selectors = {
                 'search_input': [
-                    "input[type='search']",
                     "input[placeholder*='search' i]",
                     "input[name*='search' i]",
-                    "[role='search'] input",
-                    "input.search",
-                    "input#search"
+                    "input[type='search']"
                 ],
                 'button': [
-                    "button",
-                    "[role='button']",
-                    "input[type='submit']"
+                    f"button:has-text('{text}')",
+                    f"[role='button']:has-text('{text}')"
                 ],
                 'link': [
-                    "a",
-                    "[role='link']"
+                    f"a:has-text('{text}')",
+                    f"[role='link']:has-text('{text}')"
                 ],
                 'product': [
-                    "[data-testid*='product']",
-                    ".product",
-                    "a[href*='product']"
+                    f"[data-testid*='product']:has-text('{text}')",
+                    f".product:has-text('{text}')"
                 ]
             }
+            candidates.extend(text_selectors.get(element_type, []))
 
-            for selector in generic_selectors.get(element_type, []):
+        # Website-specific selectors for search
+        if element_type == 'search_input':
+            current_url = self.page.url.lower()
+            if 'youtube.com' in current_url:
+                candidates.append("input[name='search_query']")
+            elif 'amazon' in current_url:
+                candidates.append("#twotabsearchtextbox")
+            elif 'google.com' in current_url:
+                candidates.append("input[name='q']")
+            elif 'github.com' in current_url:
+                candidates.append("input[name='q']")
+
+        # Generic selectors
+        generic_selectors = {
+            'search_input': [
+                "input[type='search']",
+                "input[placeholder*='search' i]",
+                "input[name*='search' i]",
+                "[role='search'] input",
+                "input.search",
+                "input#search"
+            ],
+            'button': [
+                "button",
+                "[role='button']",
+                "input[type='submit']"
+            ],
+            'link': [
+                "a",
+                "[role='link']"
+            ],
+            'product': [
+                "[data-testid*='product']",
+                ".product",
+                "a[href*='product']"
+            ]
+        }
+        for selector in generic_selectors.get(element_type, []):
+            if selector not in candidates:
+                candidates.append(selector)
+
+        return candidates
+
+    def _wait_visible(self, locator, page: Page) -> bool:
+        """
+        Wait for a locator with the origin's adaptive timeout, recording the outcome
+        """
+        # An element that is already visible only measures the round trip, so keep
+        # it out of the time-to-visible samples
+        if locator.is_visible():
+            return True
+        start = time.perf_counter()
+        try:
+            locator.wait_for(state='visible', timeout=self.selector_timing.timeout_for(page.url))
+        except PlaywrightTimeoutError:
+            self.selector_timing.record_miss(page.url, (time.perf_counter() - start) * 1000)
+            return False
+        self.selector_timing.record_hit(page.url, (time.perf_counter() - start) * 1000)
+        return True
+
+    def find_best_selector(self, element_type: str, text: str = None) -> Optional[str]:
+        """
+        Find the best selector for a given element type and optional text.
+        All candidates are raced in a single wait; among those with a visible
+        match once the wait resolves, the most specific one wins. Matches are
+        filtered to visible elements, so a hidden first match (a collapsed
+        menu, a template) does not hide visible ones further down.
+        """
+        try:
+            candidates = self._candidate_selectors(element_type, text)
+            if not candidates:
+                return None
+
+            visible = {selector: self.page.locator(f"{selector} >> visible=true") for selector in candidates}
+            race = visible[candidates[0]]
+            for selector in candidates[1:]:
+                race = race.or_(visible[selector])
+
+            if not self._wait_visible(race.first, self.page):
+                return None
+
+            for selector in candidates:
                 try:
-                    element = self.page.locator(selector).first
-                    if element and element.is_visible():
+                    if visible[selector].first.is_visible():
                         return selector
                 except:
                     continue
@@ -222,6 +598,18 @@ class InteractAPI:
         """
         Execute a natural language command in the browser
         """
+        self.selector_timing.begin_command()
+        result = self._execute_command(command)
+        self.last_wait_report = self.selector_timing.end_command()
+        if result[0]:
+            self.snapshot_page()
+        self.check_memory()
+        return result
+
+    def _execute_command(self, command: str) -> Tuple[bool, str]:
+        """
+        Parse and run a single command
+        """
         try:
             # Parse the command
             action = self.parse_command(command)
@@ -229,7 +617,8 @@ class InteractAPI:
             if not action:
                 return False, "Could not understand the command"
             
-            command_type = action.get('type')
+            # The classifier returns the category under 'action'
+            command_type = action.get('action') or action.get('type')
             target = action.get('target', '')
             value = action.get('value', '')
             
@@ -246,10 +635,11 @@ class InteractAPI:
                 if not search_selector:
                     return False, "Could not find search input"
                 
-                search_input = self.page.locator(search_selector).first
-                search_input.click()
-                search_input.fill(target)
-                search_input.press('Enter')
+                timeout = self.selector_timing.timeout_for(self.page.url)
+                search_input = self.page.locator(f"{search_selector} >> visible=true").first
+                search_input.click(timeout=timeout)
+                search_input.fill(target, timeout=timeout)
+                search_input.press('Enter', timeout=timeout)
                 return True, f"Searched for {target}"
             
             elif command_type == 'click':
@@ -260,20 +650,28 @@ class InteractAPI:
                 if not selector:
                     return False, f"Could not find {element_type} with text '{target}'"
                 
-                self.page.locator(selector).first.click()
+                self.page.locator(f"{selector} >> visible=true").first.click(timeout=self.selector_timing.timeout_for(self.page.url))
                 return True, f"Clicked {element_type} with text '{target}'"
             
             elif command_type == 'scroll':
-                # Handle scroll commands
-                if target == 'top':
+                # Handle scroll commands, the classifier puts the direction in 'value'
+                direction = (str(value or target or '').lower().split() or ['down'])[0]
+                if direction == 'top':
                     self.page.evaluate("window.scrollTo(0, 0)")
-                elif target == 'bottom':
+                elif direction == 'bottom':
                     self.page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+                elif direction in ('all', 'end'):
+                    # Keep scrolling while the feed loads more and return only the new items
+                    selector = self.find_best_selector(action.get('element_type') or 'link')
+                    if not selector:
+                        return False, "Could not find items to harvest"
+                    items = self.harvest_scroll(selector)
+                    return True, json.dumps(items, indent=2)
                 else:
                     # Scroll by a specific amount
-                    scroll_amount = 500 if target == 'down' else -500
+                    scroll_amount = -500 if direction == 'up' else 500
                     self.page.evaluate(f"window.scrollBy(0, {scroll_amount})")
-                return True, f"Scrolled {target}"
+                return True, f"Scrolled {direction}"
             
             elif command_type == 'extract':
                 # Handle data extraction
@@ -293,6 +691,8 @@ class InteractAPI:
         """
         Close the browser and clean up
         """
+        if self.nav_cache:
+            self.nav_cache.save()
         if self.context:
             self.context.close()
         if self.browser:
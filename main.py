@@ -1,4 +1,5 @@
 from interact_api import InteractAPI
+from classifier_service import RemoteClassifier
 import json
 import os
 import time
@@ -51,6 +52,9 @@ def execute_commands(api: InteractAPI, commands: list) -> None:
         result, message = api.execute_command(command)
         print(f"Result: {'Success' if result else 'Failed'}")
         print(f"Message: {message}")
+        if api.last_wait_report["misses"]:
+            print(f"Waited {api.last_wait_report['wasted_ms']:.0f} ms on "
+                  f"{api.last_wait_report['misses']} selector miss(es)")
         
         # If the command was an extract action, show the results
         if result and command.lower().startswith('extract'):
@@ -65,7 +69,14 @@ def execute_commands(api: InteractAPI, commands: list) -> None:
             time.sleep(1)
 
 def main():
-    api = InteractAPI()
+    # Recycle the browser context when memory grows past this many MB (disabled if unset)
+    watermark = os.environ.get("MEMORY_WATERMARK_MB")
+
+    # Talk to a shared classifier_service.py instead of loading a private model copy
+    classifier_address = os.environ.get("CLASSIFIER_ADDRESS")
+    classifier = RemoteClassifier(classifier_address) if classifier_address else None
+
+    api = InteractAPI(classifier=classifier, memory_watermark_mb=float(watermark) if watermark else None)
     print("\nWelcome to the Interactive Browser!")
     print("Type 'help' to see available commands.")
     print("Type 'exit' to close the browser and quit.")
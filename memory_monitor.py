@@ -0,0 +1,130 @@
+from playwright.sync_api import Browser, Page
+from typing import Dict, List, Optional
+import json
+import time
+
+from metrics import process_rss_mb
+
+
+class MemoryMonitor:
+    """
+    Samples browser memory and decides when the context should be recycled.
+
+    JS heap sizes come from the CDP Performance domain of the active page, and
+    RSS is summed over every Chromium process reported by SystemInfo. The
+    watermark applies to total RSS, or to the JS heap when RSS is unavailable.
+
+    Recycles are at least min_recycle_interval seconds apart. When a recycle
+    fails to bring usage under the watermark (the browser's baseline is
+    already above it), the next one waits until usage has grown by
+    regrowth_mb over that post-recycle floor, so a high baseline does not
+    cause a reload on every sample.
+    """
+
+    def __init__(self, watermark_mb: float, sample_interval: float = 30.0,
+                 log_file: Optional[str] = "memory_log.jsonl", min_recycle_interval: float = 300.0,
+                 regrowth_mb: Optional[float] = None):
+        self.watermark_mb = watermark_mb
+        self.sample_interval = sample_interval
+        self.log_file = log_file
+        self.min_recycle_interval = min_recycle_interval
+        self.regrowth_mb = regrowth_mb if regrowth_mb is not None else watermark_mb * 0.25
+        self.last_sample_time = 0.0
+        self.last_recycle_time = 0.0
+        self.floor_mb = None
+        self.recycles = 0
+
+    def due(self) -> bool:
+        return time.time() - self.last_sample_time >= self.sample_interval
+
+    def sample(self, browser: Browser, page: Page) -> Dict:
+        """
+        Take one memory sample and append it to the memory curve log
+        """
+        self.last_sample_time = time.time()
+        sample = {
+            "event": "sample",
+            "timestamp": self.last_sample_time,
+            "url": page.url,
+            "js_heap_used_mb": None,
+            "js_heap_total_mb": None,
+            "rss_mb": None
+        }
+
+        try:
+            cdp = page.context.new_cdp_session(page)
+            try:
+                cdp.send("Performance.enable")
+                metrics = {m["name"]: m["value"] for m in cdp.send("Performance.getMetrics")["metrics"]}
+                sample["js_heap_used_mb"] = round(metrics.get("JSHeapUsedSize", 0) / (1024 * 1024), 1)
+                sample["js_heap_total_mb"] = round(metrics.get("JSHeapTotalSize", 0) / (1024 * 1024), 1)
+            finally:
+                cdp.detach()
+        except Exception as e:
+            print(f"Error reading page metrics: {e}")
+
+        try:
+            cdp = browser.new_browser_cdp_session()
+            try:
+                processes = cdp.send("SystemInfo.getProcessInfo")["processInfo"]
+            finally:
+                cdp.detach()
+            rss = [process_rss_mb(p["id"]) for p in processes]
+            rss = [r for r in rss if r is not None]
+            if rss:
+                sample["rss_mb"] = round(sum(rss), 1)
+        except Exception as e:
+            print(f"Error reading process memory: {e}")
+
+        self.log(sample)
+        return sample
+
+    @staticmethod
+    def usage(sample: Dict) -> Optional[float]:
+        return sample["rss_mb"] if sample["rss_mb"] is not None else sample["js_heap_used_mb"]
+
+    def over_watermark(self, sample: Dict) -> bool:
+        usage = self.usage(sample)
+        return usage is not None and usage > self.watermark_mb
+
+    def should_recycle(self, sample: Dict) -> bool:
+        """
+        Whether a sample warrants a recycle, given the cooldown and the floor
+        left by the previous recycle
+        """
+        if not self.over_watermark(sample):
+            return False
+        if time.time() - self.last_recycle_time < self.min_recycle_interval:
+            return False
+        if self.floor_mb is not None and self.floor_mb > self.watermark_mb:
+            return self.usage(sample) > self.floor_mb + self.regrowth_mb
+        return True
+
+    def record_recycle(self, after: Dict) -> None:
+        """
+        Note a completed recycle and the usage it brought memory down to
+        """
+        self.recycles += 1
+        self.last_recycle_time = time.time()
+        self.floor_mb = self.usage(after)
+
+    def log(self, event: Dict) -> None:
+        if not self.log_file:
+            return
+        try:
+            with open(self.log_file, "a") as f:
+                f.write(json.dumps(event) + "\n")
+        except OSError as e:
+            print(f"Error writing memory log: {e}")
+
+    def read_log(self) -> List[Dict]:
+        """
+        Load the logged samples and recycle events, oldest first
+        """
+        if not self.log_file:
+            return []
+        try:
+            with open(self.log_file) as f:
+                return [json.loads(line) for line in f if line.strip()]
+        except (OSError, json.JSONDecodeError):
+            return []
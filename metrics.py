@@ -0,0 +1,77 @@
+from collections import deque
+from typing import Dict, List, Optional
+import threading
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def process_rss_mb(pid: int) -> Optional[float]:
+    """
+    Resident set size of a process in MB, via psutil or /proc when psutil is missing
+    """
+    try:
+        if psutil:
+            return psutil.Process(pid).memory_info().rss / (1024 * 1024)
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except Exception:
+        pass
+    return None
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """
+    Nearest-rank percentile of a list of samples (pct in 0-100)
+    """
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class LatencyStats:
+    """
+    Thread-safe per-name latency recorder keeping a bounded window of recent samples
+    """
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self.samples = {}
+        self.counts = {}
+        self.errors = {}
+        self.lock = threading.Lock()
+
+    def record(self, name: str, seconds: float, ok: bool = True) -> None:
+        with self.lock:
+            if name not in self.samples:
+                self.samples[name] = deque(maxlen=self.window)
+                self.counts[name] = 0
+                self.errors[name] = 0
+            self.samples[name].append(seconds * 1000)
+            self.counts[name] += 1
+            if not ok:
+                self.errors[name] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """
+        Return count, error count and mean/p50/p95/max latency in milliseconds per name
+        """
+        with self.lock:
+            result = {}
+            for name, window in self.samples.items():
+                samples = list(window)
+                result[name] = {
+                    "count": self.counts[name],
+                    "errors": self.errors[name],
+                    "mean_ms": round(sum(samples) / len(samples), 2) if samples else 0.0,
+                    "p50_ms": round(percentile(samples, 50), 2),
+                    "p95_ms": round(percentile(samples, 95), 2),
+                    "max_ms": round(max(samples), 2) if samples else 0.0
+                }
+            return result
@@ -0,0 +1,272 @@
+from playwright.sync_api import BrowserContext, Route
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Optional
+import hashlib
+import json
+import os
+import time
+
+# Default freshness (seconds) per Playwright resource type. Types missing here
+# (documents, xhr, fetch, ...) are never served from the cache in replay mode.
+DEFAULT_TTLS = {
+    "stylesheet": 24 * 3600,
+    "script": 24 * 3600,
+    "font": 7 * 24 * 3600,
+    "image": 24 * 3600,
+    "media": 24 * 3600,
+    "manifest": 3600,
+}
+
+# Headers that describe the original transfer rather than the decoded body we store
+STRIPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+
+class NavigationCache:
+    """
+    Record/replay cache for network resources, backed by a HAR archive on disk.
+
+    Modes:
+    - record: always hit the network and record every GET 200 response
+    - replay: serve fresh static resources from the archive, fetch and record misses
+    - offline: serve anything recorded regardless of age, abort everything else
+    """
+
+    INDEX_FILE = "cache.har"
+
+    def __init__(self, cache_dir: str, mode: str = "replay", max_bytes: int = 200 * 1024 * 1024,
+                 ttls: Optional[Dict[str, int]] = None, save_every: int = 20):
+        if mode not in ("record", "replay", "offline"):
+            raise ValueError(f"Unsupported cache mode: {mode}")
+
+        self.cache_dir = cache_dir
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+
+        # Rewrite the index after this many stores so a crash loses little
+        self.save_every = save_every
+        self.unsaved_stores = 0
+
+        # url -> HAR entry, least recently used first
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load()
+
+    def attach(self, context: BrowserContext) -> None:
+        """
+        Route every request of the given context through the cache
+        """
+        context.route("**/*", self._handle_route)
+
+    def _handle_route(self, route: Route) -> None:
+        request = route.request
+        if request.method != "GET":
+            # Only GETs are cached, offline mode must not reach the network for the rest either
+            if self.mode == "offline":
+                self.misses += 1
+                route.abort()
+            else:
+                route.continue_()
+            return
+
+        resource_type = request.resource_type
+        ttl = self.ttls.get(resource_type)
+
+        if self.mode == "replay" and not ttl:
+            route.continue_()
+            return
+
+        if self.mode != "record":
+            entry = self._lookup(request.url, None if self.mode == "offline" else ttl)
+            if entry is not None:
+                body = self._read_body(entry)
+                if body is not None:
+                    self.hits += 1
+                    route.fulfill(
+                        status=entry["response"]["status"],
+                        headers={h["name"]: h["value"] for h in entry["response"]["headers"]},
+                        body=body
+                    )
+                    return
+
+            self.misses += 1
+            if self.mode == "offline":
+                route.abort()
+                return
+
+        try:
+            response = route.fetch()
+            body = response.body()
+        except Exception as e:
+            print(f"Error fetching {request.url} for cache: {e}")
+            route.continue_()
+            return
+
+        route.fulfill(response=response, body=body)
+
+        if response.status == 200 and self._is_storable(response.headers):
+            self._store(request.url, resource_type, response.status, response.headers, body)
+
+    def _lookup(self, url: str, ttl: Optional[int]) -> Optional[Dict]:
+        """
+        Return the recorded entry for a URL, or None if missing or stale.
+        A ttl of None skips the freshness check.
+        """
+        entry = self.entries.get(url)
+        if entry is None:
+            return None
+        if ttl is not None and time.time() - entry["_storedAt"] > ttl:
+            return None
+
+        entry["_lastAccess"] = time.time()
+        self.entries.move_to_end(url)
+        return entry
+
+    def _is_storable(self, headers: Dict[str, str]) -> bool:
+        if "set-cookie" in headers:
+            return False
+        return "no-store" not in headers.get("cache-control", "").lower()
+
+    def _store(self, url: str, resource_type: str, status: int, headers: Dict[str, str], body: bytes) -> None:
+        size = len(body)
+        if size > self.max_bytes:
+            return
+
+        self._remove(url)
+
+        filename = hashlib.sha1(url.encode("utf-8")).hexdigest() + ".bin"
+        try:
+            with open(os.path.join(self.cache_dir, filename), "wb") as f:
+                f.write(body)
+        except OSError as e:
+            print(f"Error writing cache entry: {e}")
+            return
+
+        now = time.time()
+        self.entries[url] = {
+            "startedDateTime": datetime.fromtimestamp(now, timezone.utc).isoformat(),
+            "request": {"method": "GET", "url": url, "headers": []},
+            "response": {
+                "status": status,
+                "headers": [
+                    {"name": name, "value": value}
+                    for name, value in headers.items()
+                    if name.lower() not in STRIPPED_HEADERS
+                ],
+                "content": {
+                    "size": size,
+                    "mimeType": headers.get("content-type", ""),
+                    "_file": filename
+                }
+            },
+            "_resourceType": resource_type,
+            "_storedAt": now,
+            "_lastAccess": now
+        }
+        self.total_bytes += size
+
+        # Evict least recently used entries until we are back under the cap
+        while self.total_bytes > self.max_bytes and self.entries:
+            oldest_url = next(iter(self.entries))
+            self._remove(oldest_url)
+            self.evictions += 1
+
+        self.unsaved_stores += 1
+        if self.unsaved_stores >= self.save_every:
+            self.save()
+
+    def _remove(self, url: str) -> None:
+        entry = self.entries.pop(url, None)
+        if entry is None:
+            return
+        self.total_bytes -= entry["response"]["content"]["size"]
+        try:
+            os.remove(os.path.join(self.cache_dir, entry["response"]["content"]["_file"]))
+        except OSError:
+            pass
+
+    def _read_body(self, entry: Dict) -> Optional[bytes]:
+        try:
+            with open(os.path.join(self.cache_dir, entry["response"]["content"]["_file"]), "rb") as f:
+                return f.read()
+        except OSError:
+            # Body vanished from disk, drop the stale index entry
+            self._remove(entry["request"]["url"])
+            return None
+
+    def _load(self) -> None:
+        """
+        Rebuild the in-memory index from the HAR archive on disk
+        """
+        path = os.path.join(self.cache_dir, self.INDEX_FILE)
+        har = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    har = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"Error loading navigation cache: {e}")
+
+        entries = sorted(har.get("log", {}).get("entries", []), key=lambda e: e.get("_lastAccess", 0))
+        for entry in entries:
+            content = entry["response"]["content"]
+            try:
+                # The body may have been rewritten after the index was last saved
+                content["size"] = os.path.getsize(os.path.join(self.cache_dir, content["_file"]))
+            except OSError:
+                continue
+            self.entries[entry["request"]["url"]] = entry
+            self.total_bytes += content["size"]
+
+        # Bodies written after the last index save (e.g. before a crash) are not
+        # accounted for in max_bytes, so drop them
+        indexed = {entry["response"]["content"]["_file"] for entry in self.entries.values()}
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".bin") and name not in indexed:
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except OSError:
+                    pass
+
+        # Entries loaded past a lowered cap are evicted oldest first
+        while self.total_bytes > self.max_bytes and self.entries:
+            self._remove(next(iter(self.entries)))
+
+    def save(self) -> None:
+        """
+        Write the index to disk as a HAR 1.2 archive
+        """
+        har = {
+            "log": {
+                "version": "1.2",
+                "creator": {"name": "browser_automation", "version": "1.0"},
+                "entries": list(self.entries.values())
+            }
+        }
+        path = os.path.join(self.cache_dir, self.INDEX_FILE)
+        try:
+            with open(path + ".tmp", "w") as f:
+                json.dump(har, f)
+            os.replace(path + ".tmp", path)
+            self.unsaved_stores = 0
+        except OSError as e:
+            print(f"Error saving navigation cache: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return hit/miss/eviction counters and the current cache footprint
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+            "bytes": self.total_bytes
+        }
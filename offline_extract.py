@@ -0,0 +1,561 @@
+from html.parser import HTMLParser
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import urljoin
+import os
+import re
+
+from dom_snapshot import load_snapshot
+from extraction_patterns import EXTRACTION_PATTERNS, resolve_category
+
+VOID_ELEMENTS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link",
+    "meta", "param", "source", "track", "wbr"
+}
+RAW_TEXT_ELEMENTS = {"script", "style"}
+HIDDEN_ELEMENTS = {"script", "style", "noscript", "template", "head", "title"}
+BLOCK_ELEMENTS = {
+    "address", "article", "aside", "blockquote", "details", "dialog", "dd", "div",
+    "dl", "dt", "fieldset", "figcaption", "figure", "footer", "form", "h1", "h2",
+    "h3", "h4", "h5", "h6", "header", "hr", "li", "main", "nav", "ol", "p", "pre",
+    "section", "table", "tr", "ul"
+}
+
+# Start tag -> (open tags it implicitly closes, tags that stop the search)
+IMPLIED_END_TAGS = {
+    "li": ({"li"}, {"ul", "ol"}),
+    "dt": ({"dt", "dd"}, {"dl"}),
+    "dd": ({"dt", "dd"}, {"dl"}),
+    "tr": ({"tr", "td", "th"}, {"table", "tbody", "thead", "tfoot"}),
+    "td": ({"td", "th"}, {"tr", "table"}),
+    "th": ({"td", "th"}, {"tr", "table"}),
+    "option": ({"option"}, {"select", "datalist"}),
+    "thead": ({"tbody", "thead", "tfoot"}, {"table"}),
+    "tbody": ({"tbody", "thead", "tfoot"}, {"table"}),
+    "tfoot": ({"tbody", "thead", "tfoot"}, {"table"}),
+}
+P_SCOPE = {"button", "table", "td", "th", "html", "body"}
+
+
+class Text:
+    __slots__ = ("data", "parent")
+
+    def __init__(self, data: str, parent: "Element"):
+        self.data = data
+        self.parent = parent
+
+
+class Element:
+    __slots__ = ("tag", "attrs", "children", "parent")
+
+    def __init__(self, tag: str, attrs: Dict[str, str], parent: Optional["Element"]):
+        self.tag = tag
+        self.attrs = attrs
+        self.children = []
+        self.parent = parent
+
+    def iter_elements(self) -> Iterator["Element"]:
+        """
+        Yield descendant elements in document order
+        """
+        stack = list(reversed(self.children))
+        while stack:
+            node = stack.pop()
+            if isinstance(node, Element):
+                yield node
+                stack.extend(reversed(node.children))
+
+    def element_children(self) -> List["Element"]:
+        return [c for c in self.children if isinstance(c, Element)]
+
+    @property
+    def text_content(self) -> str:
+        parts = []
+        stack = list(reversed(self.children))
+        while stack:
+            node = stack.pop()
+            if isinstance(node, Text):
+                parts.append(node.data)
+            else:
+                stack.extend(reversed(node.children))
+        return "".join(parts)
+
+    @property
+    def inner_text(self) -> str:
+        """
+        Approximation of innerText: skips non-rendered elements, collapses
+        whitespace and breaks lines around block elements
+        """
+        parts = []
+
+        def walk(node):
+            for child in node.children:
+                if isinstance(child, Text):
+                    parts.append(re.sub(r"\s+", " ", child.data))
+                elif child.tag == "br":
+                    parts.append("\n")
+                elif child.tag not in HIDDEN_ELEMENTS:
+                    block = child.tag in BLOCK_ELEMENTS
+                    if block:
+                        parts.append("\n")
+                    walk(child)
+                    if block:
+                        parts.append("\n")
+
+        walk(self)
+        lines = [line.strip() for line in "".join(parts).split("\n")]
+        return "\n".join(line for line in lines if line)
+
+    @property
+    def inner_html(self) -> str:
+        return "".join(serialize(child) for child in self.children)
+
+
+def _escape_text(data: str) -> str:
+    return data.replace("&", "&amp;").replace("\u00a0", "&nbsp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def _escape_attr(value: str) -> str:
+    return value.replace("&", "&amp;").replace("\u00a0", "&nbsp;").replace('"', "&quot;")
+
+
+def serialize(node) -> str:
+    """
+    Serialize a node back to HTML the way a browser's innerHTML would
+    """
+    if isinstance(node, Text):
+        if node.parent is not None and node.parent.tag in RAW_TEXT_ELEMENTS:
+            return node.data
+        return _escape_text(node.data)
+
+    attrs = "".join(f' {name}="{_escape_attr(value)}"' for name, value in node.attrs.items())
+    if node.tag in VOID_ELEMENTS:
+        return f"<{node.tag}{attrs}>"
+    return f"<{node.tag}{attrs}>{node.inner_html}</{node.tag}>"
+
+
+class TreeBuilder(HTMLParser):
+    """
+    Builds an Element tree with the most common implied-end-tag rules of the HTML spec
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = Element("#document", {}, None)
+        self.stack = [self.root]
+
+    def _close_implied(self, tags: set, stops: set) -> None:
+        for i in range(len(self.stack) - 1, 0, -1):
+            tag = self.stack[i].tag
+            if tag in tags:
+                del self.stack[i:]
+                return
+            if tag in stops:
+                return
+
+    def _append(self, tag: str, attrs) -> Element:
+        parent = self.stack[-1]
+        element = Element(tag, {name: (value if value is not None else "") for name, value in attrs}, parent)
+        parent.children.append(element)
+        return element
+
+    def handle_starttag(self, tag, attrs):
+        if tag in IMPLIED_END_TAGS:
+            self._close_implied(*IMPLIED_END_TAGS[tag])
+        if tag in BLOCK_ELEMENTS:
+            self._close_implied({"p"}, P_SCOPE)
+
+        # Browsers wrap bare table rows in a tbody
+        if tag == "tr" and self.stack[-1].tag == "table":
+            self.stack.append(self._append("tbody", []))
+
+        element = self._append(tag, attrs)
+        if tag not in VOID_ELEMENTS:
+            self.stack.append(element)
+
+    def handle_startendtag(self, tag, attrs):
+        # A self-closing slash is ignored on non-void HTML elements
+        self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        for i in range(len(self.stack) - 1, 0, -1):
+            if self.stack[i].tag == tag:
+                del self.stack[i:]
+                return
+
+    def handle_data(self, data):
+        parent = self.stack[-1]
+        if parent.children and isinstance(parent.children[-1], Text):
+            parent.children[-1].data += data
+        else:
+            parent.children.append(Text(data, parent))
+
+
+def parse_html(html: str) -> Element:
+    builder = TreeBuilder()
+    builder.feed(html)
+    builder.close()
+    return builder.root
+
+
+# --- Selector engine ---------------------------------------------------------
+
+_IDENT = r"-?[_a-zA-Z][\w-]*"
+_IDENT_RE = re.compile(_IDENT)
+_TAG_RE = re.compile(_IDENT + r"|\*")
+_PSEUDO_RE = re.compile(r"::?([\w-]+)")
+_COMBINATOR_RE = re.compile(r"\s*([>+~])\s*|\s+")
+_ATTR_RE = re.compile(
+    r"\[\s*([^\s~|^$*!=\]]+)\s*(?:([~|^$*]?=)\s*(?:\"([^\"]*)\"|'([^']*)'|([^\s\]]+)))?\s*([iIsS])?\s*\]"
+)
+
+
+def _split_top_level(text: str, separator: str) -> List[str]:
+    """
+    Split on a separator that is not inside quotes, brackets or parentheses
+    """
+    parts, depth, quote, current = [], 0, None, []
+    for ch in text:
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in "'\"":
+            quote = ch
+        elif ch in "([":
+            depth += 1
+        elif ch in ")]":
+            depth -= 1
+        elif ch == separator and depth == 0:
+            parts.append("".join(current))
+            current = []
+            continue
+        current.append(ch)
+    parts.append("".join(current))
+    return parts
+
+
+def _unquote(value: str) -> str:
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "'\"":
+        return value[1:-1]
+    return value
+
+
+class Compound:
+    """
+    One compound selector, e.g. a.result[href*='watch' i]:has-text('cats')
+    """
+    __slots__ = ("tag", "ids", "classes", "attrs", "pseudos")
+
+    def __init__(self):
+        self.tag = None
+        self.ids = []
+        self.classes = []
+        self.attrs = []
+        self.pseudos = []
+
+    def matches(self, element: Element) -> bool:
+        if self.tag and self.tag != element.tag:
+            return False
+        for id_ in self.ids:
+            if element.attrs.get("id") != id_:
+                return False
+        if self.classes:
+            classes = element.attrs.get("class", "").split()
+            if any(c not in classes for c in self.classes):
+                return False
+        for name, op, value, insensitive in self.attrs:
+            actual = element.attrs.get(name)
+            if actual is None:
+                return False
+            if op is None:
+                continue
+            if insensitive:
+                actual, value = actual.lower(), value.lower()
+            if op == "=" and actual != value:
+                return False
+            if op == "~=" and value not in actual.split():
+                return False
+            if op == "|=" and not (actual == value or actual.startswith(value + "-")):
+                return False
+            if op == "^=" and not (value and actual.startswith(value)):
+                return False
+            if op == "$=" and not (value and actual.endswith(value)):
+                return False
+            if op == "*=" and not (value and value in actual):
+                return False
+        for name, argument in self.pseudos:
+            if not _match_pseudo(element, name, argument):
+                return False
+        return True
+
+
+def _match_pseudo(element: Element, name: str, argument) -> bool:
+    if name == "has-text":
+        # Playwright semantics: case-insensitive substring of normalized text
+        text = " ".join(element.text_content.split()).lower()
+        return argument in text
+    siblings = element.parent.element_children() if element.parent else [element]
+    if name == "first-child":
+        return siblings[0] is element
+    if name == "last-child":
+        return siblings[-1] is element
+    if name == "nth-child":
+        return siblings.index(element) + 1 == argument
+    if name == "not":
+        return not any(_matches(element, parts) for parts in argument)
+    return False
+
+
+def _parse_compound(text: str, pos: int):
+    compound = Compound()
+    match = _TAG_RE.match(text, pos)
+    if match:
+        if match.group() != "*":
+            compound.tag = match.group().lower()
+        pos = match.end()
+
+    while pos < len(text):
+        ch = text[pos]
+        if ch == "#" or ch == ".":
+            match = _IDENT_RE.match(text, pos + 1)
+            if not match:
+                raise ValueError(f"Invalid selector near: {text[pos:]}")
+            (compound.ids if ch == "#" else compound.classes).append(match.group())
+            pos = match.end()
+        elif ch == "[":
+            match = _ATTR_RE.match(text, pos)
+            if not match:
+                raise ValueError(f"Invalid attribute selector near: {text[pos:]}")
+            name, op, v1, v2, v3, flag = match.groups()
+            value = next((v for v in (v1, v2, v3) if v is not None), None)
+            compound.attrs.append((name.lower(), op, value, bool(flag and flag.lower() == "i")))
+            pos = match.end()
+        elif ch == ":":
+            match = _PSEUDO_RE.match(text, pos)
+            name = match.group(1).lower()
+            pos = match.end()
+            argument = None
+            if pos < len(text) and text[pos] == "(":
+                depth, end = 0, pos
+                for end in range(pos, len(text)):
+                    if text[end] == "(":
+                        depth += 1
+                    elif text[end] == ")":
+                        depth -= 1
+                        if depth == 0:
+                            break
+                argument = text[pos + 1:end]
+                pos = end + 1
+            if name == "has-text":
+                argument = " ".join(_unquote(argument).split()).lower()
+            elif name == "nth-child":
+                argument = int(argument)
+            elif name == "not":
+                argument = parse_selector(argument)
+            elif name not in ("first-child", "last-child"):
+                raise ValueError(f"Unsupported pseudo-class: :{name}")
+            compound.pseudos.append((name, argument))
+        else:
+            break
+    return compound, pos
+
+
+def parse_selector(selector: str) -> List[List]:
+    """
+    Parse a selector list into [(combinator, Compound), ...] chains, one per comma group
+    """
+    groups = []
+    for group in _split_top_level(selector, ","):
+        text = group.strip()
+        if not text:
+            raise ValueError(f"Invalid selector: {selector}")
+        parts, pos, combinator = [], 0, None
+        while pos < len(text):
+            compound, pos = _parse_compound(text, pos)
+            parts.append((combinator, compound))
+            match = _COMBINATOR_RE.match(text, pos)
+            if pos < len(text) and not match:
+                raise ValueError(f"Invalid selector near: {text[pos:]}")
+            if match:
+                combinator = match.group(1) or " "
+                pos = match.end()
+        groups.append(parts)
+    return groups
+
+
+def _matches(element: Element, parts: List) -> bool:
+    combinator, compound = parts[-1]
+    if not compound.matches(element):
+        return False
+    if len(parts) == 1:
+        return True
+
+    rest = parts[:-1]
+    if combinator == ">":
+        parent = element.parent
+        return parent is not None and parent.tag != "#document" and _matches(parent, rest)
+    if combinator == " ":
+        ancestor = element.parent
+        while ancestor is not None and ancestor.tag != "#document":
+            if _matches(ancestor, rest):
+                return True
+            ancestor = ancestor.parent
+        return False
+
+    siblings = element.parent.element_children()
+    index = siblings.index(element)
+    if combinator == "+":
+        return index > 0 and _matches(siblings[index - 1], rest)
+    return any(_matches(sibling, rest) for sibling in siblings[:index])
+
+
+def query_selector_all(root: Element, selector: str) -> List[Element]:
+    groups = parse_selector(selector)
+    return [element for element in root.iter_elements() if any(_matches(element, parts) for parts in groups)]
+
+
+# --- Offline extraction ------------------------------------------------------
+
+class OfflineExtractor:
+    """
+    Runs the ExtractAPI categories and extract_page_content queries against
+    stored HTML, without a browser
+    """
+
+    def __init__(self, html: str, url: str = ""):
+        self.url = url
+        self.root = parse_html(html)
+
+        # Honour <base href> when resolving relative URLs, like the browser does
+        base = next((e for e in self.root.iter_elements() if e.tag == "base" and e.attrs.get("href")), None)
+        self.base_url = urljoin(url, base.attrs["href"]) if base else url
+
+    @classmethod
+    def from_snapshot(cls, path: str) -> "OfflineExtractor":
+        snapshot = load_snapshot(path)
+        return cls(snapshot["html"], snapshot["url"])
+
+    def _property(self, element: Element, name: str) -> Any:
+        """
+        Emulate the DOM properties ExtractAPI reads via el.<name>
+        """
+        if name == "textContent":
+            return element.text_content
+        if name == "innerText":
+            return element.inner_text
+        if name == "innerHTML":
+            return element.inner_html
+        if name == "href" and element.tag not in ("a", "area", "link"):
+            return None
+        if name in ("href", "src"):
+            value = element.attrs.get(name)
+            return urljoin(self.base_url, value.strip()) if value is not None else ""
+        if name == "action":
+            action = element.attrs.get("action", "").strip()
+            return urljoin(self.base_url, action) if action else self.url
+        if name == "method":
+            method = element.attrs.get("method", "").lower()
+            return method if method in ("get", "post", "dialog") else "get"
+        return element.attrs.get(name)
+
+    def extract_page_content(self, selector: str, limit: int = 3) -> List[Dict]:
+        """
+        Same output as InteractAPI.extract_page_content
+        """
+        try:
+            return [
+                {
+                    "text": element.text_content.strip(),
+                    "href": self._property(element, "href") or None,
+                    "attributes": dict(element.attrs)
+                }
+                for element in query_selector_all(self.root, selector)[:limit]
+            ]
+        except Exception as e:
+            print(f"Error extracting content: {str(e)}")
+            return []
+
+    def extract_data(self, command: str) -> Dict[str, Any]:
+        """
+        Same output as ExtractAPI.extract_data
+        """
+        try:
+            category = resolve_category(command)
+            if not category:
+                return {"error": "Unsupported extraction command"}
+
+            pattern = EXTRACTION_PATTERNS[category]
+            if category == "text":
+                text_content = []
+                for selector in pattern["selectors"]:
+                    for element in query_selector_all(self.root, selector):
+                        for attr in pattern["attributes"]:
+                            text = self._property(element, attr)
+                            if text and text.strip():
+                                text_content.append(text.strip())
+                return {"text": text_content}
+
+            items = []
+            for element in query_selector_all(self.root, pattern["selectors"][0]):
+                data = {}
+                for attr in pattern["attributes"]:
+                    value = self._property(element, attr)
+                    if value:
+                        data[attr] = value
+                if data:
+                    items.append(data)
+            return {category: items}
+
+        except Exception as e:
+            return {"error": f"Extraction failed: {str(e)}"}
+
+
+def _reextract_one(job) -> Dict[str, Any]:
+    path, selector, limit, command = job
+    try:
+        extractor = OfflineExtractor.from_snapshot(path)
+    except Exception as e:
+        return {"path": path, "url": None, "error": f"Could not load snapshot: {e}"}
+
+    if selector:
+        data = extractor.extract_page_content(selector, limit)
+    else:
+        data = extractor.extract_data(command)
+    return {"path": path, "url": extractor.url, "data": data}
+
+
+def reextract(paths: List[str], selector: Optional[str] = None, limit: int = 3,
+              command: Optional[str] = None, processes: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Re-run a selector query or an extraction command over many snapshots
+    in parallel across CPU cores. Results follow the order of paths.
+    """
+    if not selector and not command:
+        raise ValueError("Provide either a selector or an extraction command")
+
+    jobs = [(path, selector, limit, command) for path in paths]
+    processes = processes or os.cpu_count() or 1
+    if processes == 1 or len(jobs) < 2:
+        return [_reextract_one(job) for job in jobs]
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        return list(executor.map(_reextract_one, jobs, chunksize=max(1, len(jobs) // (processes * 4))))
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    from dom_snapshot import SnapshotStore
+
+    parser = argparse.ArgumentParser(description="Re-extract stored DOM snapshots without a browser")
+    parser.add_argument("snapshot_dir")
+    parser.add_argument("--selector", help="CSS selector, as for extract_page_content")
+    parser.add_argument("--limit", type=int, default=3)
+    parser.add_argument("--command", help="ExtractAPI command, e.g. 'extract links'")
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+
+    results = reextract(SnapshotStore(args.snapshot_dir).paths(), args.selector, args.limit,
+                        args.command, args.processes)
+    print(json.dumps(results, indent=2))
@@ -0,0 +1,240 @@
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import json
+import sys
+
+# Attribute-name tuples are shared between records with the same schema, up to
+# this many distinct schemas so long-running processes do not grow without bound
+MAX_SHARED_SCHEMAS = 4096
+_schemas: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
+
+def intern_names(names, schemas: Optional[Dict] = None) -> Tuple[str, ...]:
+    """
+    Return a canonical tuple of interned attribute names, shared through the given
+    table (the module-wide one by default)
+    """
+    schemas = _schemas if schemas is None else schemas
+    key = tuple(names)
+    schema = schemas.get(key)
+    if schema is None:
+        schema = tuple(sys.intern(name) for name in key)
+        if len(schemas) < MAX_SHARED_SCHEMAS:
+            schemas[schema] = schema
+    return schema
+
+
+class ElementRecord:
+    """
+    One element from extract_page_content
+    """
+    __slots__ = ("text", "href", "attr_names", "attr_values")
+
+    def __init__(self, text: str, href: Optional[str], attr_names: Tuple[str, ...], attr_values: Tuple[str, ...]):
+        self.text = text
+        self.href = href
+        self.attr_names = attr_names
+        self.attr_values = attr_values
+
+    @classmethod
+    def from_dict(cls, item: Dict[str, Any]) -> "ElementRecord":
+        attributes = item.get("attributes") or {}
+        return cls(item.get("text", ""), item.get("href"), intern_names(attributes), tuple(attributes.values()))
+
+    @property
+    def attributes(self) -> Dict[str, str]:
+        return dict(zip(self.attr_names, self.attr_values))
+
+    def get(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        try:
+            return self.attr_values[self.attr_names.index(name)]
+        except ValueError:
+            return default
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"text": self.text, "href": self.href, "attributes": self.attributes}
+
+    def __repr__(self):
+        return f"ElementRecord(text={self.text!r}, href={self.href!r})"
+
+
+class LinkRecord:
+    __slots__ = ("href", "text")
+
+    def __init__(self, href: Optional[str], text: Optional[str]):
+        self.href = href
+        self.text = text
+
+    @classmethod
+    def from_dict(cls, item: Dict[str, Any]) -> "LinkRecord":
+        return cls(item.get("href"), item.get("textContent"))
+
+    def to_dict(self) -> Dict[str, str]:
+        return _drop_empty({"href": self.href, "textContent": self.text})
+
+
+class ImageRecord:
+    __slots__ = ("src", "alt")
+
+    def __init__(self, src: Optional[str], alt: Optional[str]):
+        self.src = src
+        self.alt = alt
+
+    @classmethod
+    def from_dict(cls, item: Dict[str, Any]) -> "ImageRecord":
+        return cls(item.get("src"), item.get("alt"))
+
+    def to_dict(self) -> Dict[str, str]:
+        return _drop_empty({"src": self.src, "alt": self.alt})
+
+
+class TableRecord:
+    __slots__ = ("inner_html",)
+
+    def __init__(self, inner_html: Optional[str]):
+        self.inner_html = inner_html
+
+    @classmethod
+    def from_dict(cls, item: Dict[str, Any]) -> "TableRecord":
+        return cls(item.get("innerHTML"))
+
+    def to_dict(self) -> Dict[str, str]:
+        return _drop_empty({"innerHTML": self.inner_html})
+
+
+class FormRecord:
+    __slots__ = ("action", "method")
+
+    def __init__(self, action: Optional[str], method: Optional[str]):
+        # Methods come from a tiny vocabulary, so share the strings
+        self.action = action
+        self.method = sys.intern(method) if method else method
+
+    @classmethod
+    def from_dict(cls, item: Dict[str, Any]) -> "FormRecord":
+        return cls(item.get("action"), item.get("method"))
+
+    def to_dict(self) -> Dict[str, str]:
+        return _drop_empty({"action": self.action, "method": self.method})
+
+
+# ExtractAPI category -> record class
+CATEGORY_RECORDS = {
+    "links": LinkRecord,
+    "images": ImageRecord,
+    "tables": TableRecord,
+    "forms": FormRecord,
+}
+
+
+def _drop_empty(data: Dict[str, Any]) -> Dict[str, Any]:
+    # ExtractAPI only emits attributes that had a truthy value
+    return {key: value for key, value in data.items() if value}
+
+
+def to_records(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert an ExtractAPI result into typed records. Text stays a list of strings.
+    """
+    converted = {}
+    for category, items in result.items():
+        record_cls = CATEGORY_RECORDS.get(category)
+        converted[category] = [record_cls.from_dict(item) for item in items] if record_cls else items
+    return converted
+
+
+def to_plain(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    JSON-compatible view of a result produced by to_records
+    """
+    return {
+        category: [item.to_dict() if hasattr(item, "to_dict") else item for item in items]
+        if isinstance(items, list) else items
+        for category, items in result.items()
+    }
+
+
+class ElementTable:
+    """
+    Compact container for large extract_page_content results.
+    Text and href are parallel lists. Attributes are stored sparsely, as one
+    shared schema tuple (the attribute names, in element order) plus one value
+    tuple per row, so rare attributes cost nothing on rows that lack them.
+    """
+
+    # Short attribute values (class names, roles, ...) repeat a lot, so equal
+    # values share one string object, up to this many distinct values
+    MAX_SHARED_VALUES = 10000
+    MAX_SHARED_LENGTH = 64
+
+    def __init__(self):
+        self.text: List[str] = []
+        self.href: List[Optional[str]] = []
+        self.schemas: List[Tuple[str, ...]] = []
+        self.values: List[Tuple[str, ...]] = []
+        self._shared: Dict[str, str] = {}
+        self._schemas: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
+    def _share(self, value: Optional[str]) -> Optional[str]:
+        if value is None or len(value) > self.MAX_SHARED_LENGTH:
+            return value
+        shared = self._shared.get(value)
+        if shared is not None:
+            return shared
+        if len(self._shared) < self.MAX_SHARED_VALUES:
+            self._shared[value] = value
+        return value
+
+    def __len__(self) -> int:
+        return len(self.text)
+
+    def append(self, text: str, href: Optional[str], attributes: Dict[str, str]) -> None:
+        self.text.append(text)
+        self.href.append(href)
+        self.schemas.append(intern_names(attributes, self._schemas))
+        self.values.append(tuple(self._share(value) for value in attributes.values()))
+
+    def extend_columnar(self, names: List[str], rows: List[List]) -> None:
+        """
+        Append rows in the compact wire format produced by the in-page extractor:
+        [text, href, [name_index, value, name_index, value, ...]]
+        """
+        for text, href, pairs in rows:
+            self.append(text, href, {names[pairs[i]]: pairs[i + 1] for i in range(0, len(pairs), 2)})
+
+    @classmethod
+    def from_dicts(cls, items: List[Dict[str, Any]]) -> "ElementTable":
+        table = cls()
+        for item in items:
+            table.append(item.get("text", ""), item.get("href"), item.get("attributes") or {})
+        return table
+
+    def attributes(self, index: int) -> Dict[str, str]:
+        return dict(zip(self.schemas[index], self.values[index]))
+
+    def column(self, name: str) -> List[Optional[str]]:
+        """
+        One attribute across all rows, with None where an element lacks it
+        """
+        return [
+            values[schema.index(name)] if name in schema else None
+            for schema, values in zip(self.schemas, self.values)
+        ]
+
+    def __getitem__(self, index: int) -> ElementRecord:
+        return ElementRecord(self.text[index], self.href[index], self.schemas[index], self.values[index])
+
+    def __iter__(self) -> Iterator[ElementRecord]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """
+        The list-of-dicts view returned by extract_page_content
+        """
+        return [
+            {"text": self.text[i], "href": self.href[i], "attributes": self.attributes(i)}
+            for i in range(len(self))
+        ]
+
+    def to_json(self, indent: Optional[int] = 2) -> str:
+        return json.dumps(self.to_dicts(), indent=indent)
@@ -0,0 +1,95 @@
+from collections import deque
+from typing import Dict
+from urllib.parse import urlsplit
+
+from metrics import percentile
+
+
+class SelectorTiming:
+    """
+    Adaptive selector timeouts based on how long elements took to appear on
+    each origin, plus per-command accounting of time lost on misses.
+
+    The timeout for an origin is its p95 time-to-visible times a multiplier
+    plus a margin, clamped to [min_ms, max_ms]. Origins with too little
+    history use default_ms. Misses stay out of the percentile so a wrong
+    guess keeps failing fast; only after miss_streak consecutive misses on an
+    origin is its timeout raised by one multiplier step, and the next hit
+    drops it back.
+    """
+
+    def __init__(self, default_ms: float = 5000, min_ms: float = 500, max_ms: float = 15000,
+                 multiplier: float = 2.0, margin_ms: float = 250, min_samples: int = 3, window: int = 50,
+                 miss_streak: int = 3):
+        self.default_ms = default_ms
+        self.min_ms = min_ms
+        self.max_ms = max_ms
+        self.multiplier = multiplier
+        self.margin_ms = margin_ms
+        self.min_samples = min_samples
+        self.window = window
+        self.miss_streak = miss_streak
+
+        self.samples: Dict[str, deque] = {}
+        self.misses: Dict[str, int] = {}
+        self.consecutive_misses: Dict[str, int] = {}
+
+        self.command_misses = 0
+        self.command_wasted_ms = 0.0
+
+    @staticmethod
+    def origin(url: str) -> str:
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+    def timeout_for(self, url: str) -> float:
+        """
+        Timeout in milliseconds for waiting on an element of this URL's origin
+        """
+        origin = self.origin(url)
+        samples = self.samples.get(origin)
+        if not samples or len(samples) < self.min_samples:
+            return self.default_ms
+        timeout = max(self.min_ms, percentile(list(samples), 95) * self.multiplier + self.margin_ms)
+        if self.consecutive_misses.get(origin, 0) >= self.miss_streak:
+            timeout *= self.multiplier
+        return min(self.max_ms, timeout)
+
+    def record_hit(self, url: str, elapsed_ms: float) -> None:
+        origin = self.origin(url)
+        if origin not in self.samples:
+            self.samples[origin] = deque(maxlen=self.window)
+        self.samples[origin].append(elapsed_ms)
+        self.consecutive_misses[origin] = 0
+
+    def record_miss(self, url: str, elapsed_ms: float) -> None:
+        origin = self.origin(url)
+        self.misses[origin] = self.misses.get(origin, 0) + 1
+        self.consecutive_misses[origin] = self.consecutive_misses.get(origin, 0) + 1
+        self.command_misses += 1
+        self.command_wasted_ms += elapsed_ms
+
+    def begin_command(self) -> None:
+        self.command_misses = 0
+        self.command_wasted_ms = 0.0
+
+    def end_command(self) -> Dict[str, float]:
+        """
+        Misses and milliseconds spent waiting on them since begin_command
+        """
+        return {"misses": self.command_misses, "wasted_ms": round(self.command_wasted_ms, 1)}
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Per-origin recent hit samples, miss count, p95 time-to-visible and current timeout
+        """
+        origins = set(self.samples) | set(self.misses)
+        return {
+            origin: {
+                "samples": len(self.samples.get(origin, ())),
+                "misses": self.misses.get(origin, 0),
+                "p95_ms": round(percentile(list(self.samples.get(origin, ())), 95), 1),
+                "timeout_ms": round(self.timeout_for(origin), 1)
+            }
+            for origin in sorted(origins)
+        }
@@ -0,0 +1,382 @@
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from concurrent.futures import CancelledError, Future, TimeoutError as FutureTimeout
+from typing import Callable, Dict, Tuple
+import argparse
+import json
+import queue
+import threading
+import time
+import uuid
+
+from command_classifier import CommandClassifier
+from extract_api import ExtractAPI
+from interact_api import InteractAPI
+from metrics import LatencyStats
+
+
+class SharedClassifier:
+    """
+    Serializes access to a single loaded classifier shared by all sessions
+    """
+
+    def __init__(self, classifier: CommandClassifier):
+        self.classifier = classifier
+        self.lock = threading.Lock()
+
+    def classify_command(self, command: str) -> dict:
+        with self.lock:
+            return self.classifier.classify_command(command)
+
+
+class Session:
+    """
+    A browser session owned by a dedicated worker thread.
+    Playwright's sync API is bound to the thread that started it, so every
+    call on the InteractAPI goes through this session's bounded job queue.
+    """
+
+    def __init__(self, api_factory: Callable[[], InteractAPI], queue_size: int):
+        self.session_id = uuid.uuid4().hex
+        self.api_factory = api_factory
+        self.jobs = queue.Queue(maxsize=queue_size)
+        self.ready = threading.Event()
+        self.error = None
+        self.api = None
+        self.busy = False
+        self.closed = False
+        self.last_active = time.time()
+
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        try:
+            self.api = self.api_factory()
+        except Exception as e:
+            self.error = e
+            self.ready.set()
+            return
+        self.ready.set()
+
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            fn, future = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            self.busy = True
+            try:
+                future.set_result(fn(self.api))
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                self.busy = False
+                self.last_active = time.time()
+
+        try:
+            self.api.close()
+        except Exception as e:
+            print(f"Error closing session {self.session_id}: {e}")
+
+    def submit(self, fn: Callable[[InteractAPI], object]) -> Future:
+        """
+        Queue a job for the worker thread. Raises queue.Full when the session is saturated
+        and RuntimeError once it is closed.
+        """
+        if self.closed:
+            raise RuntimeError("Session is closed")
+        future = Future()
+        self.jobs.put_nowait((fn, future))
+        self.last_active = time.time()
+        return future
+
+    def is_idle(self, timeout: float) -> bool:
+        return not self.busy and self.jobs.empty() and time.time() - self.last_active > timeout
+
+    def close(self):
+        """
+        Cancel queued jobs and stop the worker once its current job finishes, without blocking
+        """
+        if self.closed:
+            return
+        self.closed = True
+        while True:
+            try:
+                while True:
+                    job = self.jobs.get_nowait()
+                    if job is not None:
+                        job[1].cancel()
+            except queue.Empty:
+                pass
+            try:
+                self.jobs.put_nowait(None)
+                return
+            except queue.Full:
+                # A submit raced with the drain, drain again
+                continue
+
+
+class AutomationServer:
+    """
+    Keeps browsers and the classifier warm between commands and exposes
+    session create/execute/extract/close over a local HTTP API
+    """
+
+    def __init__(self, classifier, host: str = "127.0.0.1", port: int = 8765, max_sessions: int = 4,
+                 queue_size: int = 8, idle_timeout: float = 600, warm_sessions: int = 1,
+                 request_timeout: float = 120, headless: bool = True):
+        # A remote classifier batches concurrent requests itself, so only guard local models
+        self.classifier = classifier if getattr(classifier, "thread_safe", False) else SharedClassifier(classifier)
+        self.max_sessions = max_sessions
+        self.queue_size = queue_size
+        self.idle_timeout = idle_timeout
+        self.warm_sessions = warm_sessions
+        self.request_timeout = request_timeout
+        self.headless = headless
+
+        self.sessions: Dict[str, Session] = {}
+        # Sessions being started, counted against max_sessions until they are registered
+        self.pending = 0
+        self.spares = queue.Queue()
+        self.lock = threading.Lock()
+        self.stats = LatencyStats()
+        self.running = True
+
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+
+        for _ in range(warm_sessions):
+            self.spares.put(self._spawn())
+
+        self.reaper = threading.Thread(target=self._reap_idle_sessions, daemon=True)
+        self.reaper.start()
+
+    def _spawn(self) -> Session:
+        return Session(
+            lambda: InteractAPI(classifier=self.classifier, headless=self.headless),
+            self.queue_size
+        )
+
+    def create_session(self) -> Tuple[int, Dict]:
+        with self.lock:
+            if len(self.sessions) + self.pending >= self.max_sessions:
+                return 503, {"error": "Session limit reached"}
+            self.pending += 1
+
+            # Hand out a pre-launched browser if one is ready and start warming a replacement
+            try:
+                session = self.spares.get_nowait()
+                if self.warm_sessions:
+                    self.spares.put(self._spawn())
+            except queue.Empty:
+                session = self._spawn()
+
+        session.ready.wait(self.request_timeout)
+        if session.error or not session.ready.is_set():
+            with self.lock:
+                self.pending -= 1
+            session.close()
+            return 500, {"error": f"Could not start browser: {session.error or 'timed out'}"}
+
+        session.last_active = time.time()
+        with self.lock:
+            self.pending -= 1
+            self.sessions[session.session_id] = session
+        return 201, {"session_id": session.session_id}
+
+    def close_session(self, session_id: str) -> Tuple[int, Dict]:
+        with self.lock:
+            session = self.sessions.pop(session_id, None)
+        if not session:
+            return 404, {"error": "Unknown session"}
+        session.close()
+        return 200, {"closed": session_id}
+
+    def run_in_session(self, session_id: str, fn: Callable[[InteractAPI], Dict]) -> Tuple[int, Dict]:
+        with self.lock:
+            session = self.sessions.get(session_id)
+        if not session:
+            return 404, {"error": "Unknown session"}
+
+        try:
+            future = session.submit(fn)
+        except queue.Full:
+            return 503, {"error": "Session queue is full, retry later"}
+        except RuntimeError:
+            return 404, {"error": "Unknown session"}
+
+        try:
+            return 200, future.result(timeout=self.request_timeout)
+        except FutureTimeout:
+            return 504, {"error": "Command timed out"}
+        except CancelledError:
+            return 410, {"error": "Session was closed before the command ran"}
+        except Exception as e:
+            return 500, {"error": str(e)}
+
+    def execute(self, session_id: str, body: Dict) -> Tuple[int, Dict]:
+        command = body.get("command")
+        if not command:
+            return 400, {"error": "Missing 'command'"}
+
+        def job(api: InteractAPI) -> Dict:
+            success, message = api.execute_command(command)
+            return {"success": success, "message": message, "selector_misses": api.last_wait_report}
+
+        return self.run_in_session(session_id, job)
+
+    def extract(self, session_id: str, body: Dict) -> Tuple[int, Dict]:
+        selector = body.get("selector")
+        command = body.get("command")
+        if not selector and not command:
+            return 400, {"error": "Provide either 'selector' or 'command'"}
+
+        def job(api: InteractAPI) -> Dict:
+            if selector:
+                return {"data": api.extract_page_content(selector, int(body.get("limit", 3)))}
+            return {"data": ExtractAPI(api.page, api.extraction_cache, api.snapshot_store).extract_data(command)}
+
+        return self.run_in_session(session_id, job)
+
+    def get_stats(self) -> Tuple[int, Dict]:
+        with self.lock:
+            queue_depths = {sid: s.jobs.qsize() for sid, s in self.sessions.items()}
+            extraction_cache = {
+                sid: s.api.extraction_cache.stats() for sid, s in self.sessions.items() if s.api
+            }
+        return 200, {
+            "endpoints": self.stats.snapshot(),
+            "sessions": len(queue_depths),
+            "warm_sessions": self.spares.qsize(),
+            "queue_depths": queue_depths,
+            "extraction_cache": extraction_cache
+        }
+
+    def _reap_idle_sessions(self):
+        interval = max(1.0, min(30.0, self.idle_timeout / 4))
+        while self.running:
+            time.sleep(interval)
+            with self.lock:
+                idle = [sid for sid, s in self.sessions.items() if s.is_idle(self.idle_timeout)]
+            for session_id in idle:
+                print(f"Closing idle session {session_id}")
+                self.close_session(session_id)
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _route(self, method: str) -> Tuple[str, Callable[[], Tuple[int, Dict]]]:
+                parts = [p for p in self.path.split("?")[0].split("/") if p]
+
+                if method == "GET" and parts == ["stats"]:
+                    return "stats", server.get_stats
+                if method == "POST" and parts == ["sessions"]:
+                    return "create", server.create_session
+                if len(parts) == 2 and parts[0] == "sessions" and method == "DELETE":
+                    return "close", lambda: server.close_session(parts[1])
+                if len(parts) == 3 and parts[0] == "sessions" and method == "POST":
+                    if parts[2] == "execute":
+                        return "execute", lambda: server.execute(parts[1], self._read_json())
+                    if parts[2] == "extract":
+                        return "extract", lambda: server.extract(parts[1], self._read_json())
+                    if parts[2] == "close":
+                        return "close", lambda: server.close_session(parts[1])
+                return "unknown", lambda: (404, {"error": "Not found"})
+
+            def _read_json(self) -> Dict:
+                length = int(self.headers.get("Content-Length") or 0)
+                if not length:
+                    return {}
+                return json.loads(self.rfile.read(length))
+
+            def _handle(self, method: str):
+                start = time.perf_counter()
+                endpoint, action = self._route(method)
+                try:
+                    status, payload = action()
+                except json.JSONDecodeError:
+                    status, payload = 400, {"error": "Invalid JSON body"}
+                except Exception as e:
+                    status, payload = 500, {"error": str(e)}
+                server.stats.record(endpoint, time.perf_counter() - start, ok=status < 400)
+
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                if status == 503:
+                    self.send_header("Retry-After", "1")
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._handle("GET")
+
+            def do_POST(self):
+                self._handle("POST")
+
+            def do_DELETE(self):
+                self._handle("DELETE")
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def serve_forever(self):
+        host, port = self.httpd.server_address[:2]
+        print(f"Automation server listening on http://{host}:{port}")
+        try:
+            self.httpd.serve_forever()
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        """
+        Stop accepting requests and close every browser
+        """
+        self.running = False
+        self.httpd.server_close()
+        with self.lock:
+            sessions = list(self.sessions.values())
+            self.sessions.clear()
+        while not self.spares.empty():
+            sessions.append(self.spares.get_nowait())
+        for session in sessions:
+            session.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the browser automation server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--max-sessions", type=int, default=4)
+    parser.add_argument("--queue-size", type=int, default=8)
+    parser.add_argument("--idle-timeout", type=float, default=600)
+    parser.add_argument("--warm-sessions", type=int, default=1)
+    parser.add_argument("--show-browser", action="store_true", help="Run browsers with a visible window")
+    parser.add_argument("--classifier-address", help="Use a shared classifier_service.py instead of loading a model")
+    args = parser.parse_args()
+
+    if args.classifier_address:
+        from classifier_service import RemoteClassifier
+        classifier = RemoteClassifier(args.classifier_address)
+    else:
+        classifier = CommandClassifier()
+
+    automation_server = AutomationServer(
+        classifier,
+        host=args.host,
+        port=args.port,
+        max_sessions=args.max_sessions,
+        queue_size=args.queue_size,
+        idle_timeout=args.idle_timeout,
+        warm_sessions=args.warm_sessions,
+        headless=not args.show_browser
+    )
+    try:
+        automation_server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down...")